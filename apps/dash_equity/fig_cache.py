@@ -0,0 +1,49 @@
+# apps/dash_equity/fig_cache.py
+
+import os
+import plotly.io as pio
+
+CACHE_DIR = os.path.join(".cache", "dash_equity")
+
+
+def _atomic_write(path: str, text: str) -> None:
+    # write to a per-process temp file, then rename: concurrent workers never see partial files
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def cached_figure(name: str, source_path: str, build):
+    """
+    Return the Plotly figure `name`, built by `build()`, cached on disk as JSON.
+
+    The cache entry is keyed by the mtime of `source_path` (stored in a
+    `.stamp` sidecar), so it is rebuilt whenever the source parquet changes.
+    If `source_path` does not exist the figure is built without caching.
+    """
+    try:
+        stamp = repr(os.path.getmtime(source_path))
+    except OSError:
+        return build()
+
+    fig_path = os.path.join(CACHE_DIR, f"{name}.json")
+    stamp_path = f"{fig_path}.stamp"
+
+    try:
+        with open(stamp_path, encoding="utf-8") as f:
+            if f.read() == stamp:
+                return pio.read_json(fig_path)
+    except (OSError, ValueError):
+        pass
+
+    fig = build()
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _atomic_write(fig_path, pio.to_json(fig))
+        _atomic_write(stamp_path, stamp)
+    except OSError as e:
+        print(f"[WARN] Could not cache figure '{name}': {e}")
+
+    return fig
@@ -1,58 +1,94 @@
 # apps/dash_equity/pages/overview.py
 
 import dash
-from dash import html, dcc
+from dash import html, dcc, Input, Output
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import os
 
+from fig_cache import cached_figure
+
 # Register this as a Dash page
 dash.register_page(__name__, path="/", name="Overview")
 
 # --- Load Data ---
 PARQUET_PATH = os.path.join("data", "gold", "financials_panel.parquet")
+OVERVIEW_COLS = ["name", "Revenue", "period"]
 
-try:
-    df = pd.read_parquet(PARQUET_PATH)
-except Exception as e:
-    df = pd.DataFrame({"Error": [str(e)]})
 
-# --- Use relevant columns ---
-if all(col in df.columns for col in ["name", "Revenue", "period"]):
-    df = df[["name", "Revenue", "period"]].dropna()
-    df["period"] = pd.to_datetime(df["period"], errors="coerce")
+def _load_overview_frame(columns=OVERVIEW_COLS, path=PARQUET_PATH, top_n: int = 10) -> pd.DataFrame:
+    """
+    Read only `columns` from the panel parquet and aggregate in Arrow:
+    Revenue summed per (name, period), restricted to the `top_n` companies
+    by total revenue. Only that small result is converted to pandas.
+    """
+    table = pq.read_table(path, columns=list(columns)).drop_null()
 
     # Aggregate in case multiple entries exist per company-period
-    df = df.groupby(["name", "period"], as_index=False)["Revenue"].sum()
-
-    # Select top 10 companies by total revenue
-    top10 = df.groupby("name")["Revenue"].sum().nlargest(10).index
-    df_top = df[df["name"].isin(top10)]
-
-    fig = px.line(
-        df_top,
-        x="period",
-        y="Revenue",
-        color="name",
-        markers=True,
-        title="Revenue Trend — Top 10 Companies by Total Revenue",
-        labels={"period": "Period End", "Revenue": "Revenue", "name": "Company"},
-    )
-else:
-    import plotly.graph_objects as go
-    fig = go.Figure()
-    fig.add_annotation(
-        text="Columns 'name', 'Revenue', or 'period' missing in parquet.",
-        x=0.5, y=0.5, showarrow=False, font=dict(size=14)
+    per_period = table.group_by(["name", "period"]).aggregate([("Revenue", "sum")])
+
+    # Select top companies by total revenue
+    totals = per_period.group_by("name").aggregate([("Revenue_sum", "sum")])
+    top_idx = pc.select_k_unstable(
+        totals, k=min(top_n, totals.num_rows), sort_keys=[("Revenue_sum_sum", "descending")]
     )
-    fig.update_layout(title="Data Error")
+    top_names = totals["name"].take(top_idx)
+
+    df_top = per_period.filter(pc.is_in(per_period["name"], value_set=top_names))
+    # Arrow's group_by output is unordered; px.line connects points in row order
+    df_top = df_top.sort_by([("name", "ascending"), ("period", "ascending")]).to_pandas()
+    return df_top.rename(columns={"Revenue_sum": "Revenue"})
+
+
+def build_overview_fig():
+    try:
+        df = _load_overview_frame()
+    except Exception as e:
+        df = pd.DataFrame({"Error": [str(e)]})
+
+    # --- Use relevant columns ---
+    if all(col in df.columns for col in OVERVIEW_COLS):
+        df_top = df
+        if not pd.api.types.is_datetime64_any_dtype(df_top["period"]):
+            # explicit format: FSDS periods are YYYYMMDD strings (skips format inference)
+            df_top["period"] = pd.to_datetime(df_top["period"], errors="coerce", format="%Y%m%d")
+
+        fig = px.line(
+            df_top,
+            x="period",
+            y="Revenue",
+            color="name",
+            markers=True,
+            render_mode="webgl",
+            title="Revenue Trend — Top 10 Companies by Total Revenue",
+            labels={"period": "Period End", "Revenue": "Revenue", "name": "Company"},
+        )
+    else:
+        fig = go.Figure()
+        fig.add_annotation(
+            text="Columns 'name', 'Revenue', or 'period' missing in parquet.",
+            x=0.5, y=0.5, showarrow=False, font=dict(size=14)
+        )
+        fig.update_layout(title="Data Error")
+    return fig
+
 
 # --- Page Layout ---
 layout = html.Div(
     [
         html.H2("Overview"),
         html.P("Shows Revenue trends for the top 10 companies in the dataset."),
-        dcc.Graph(figure=fig),
+        dcc.Loading(dcc.Graph(id="overview-graph")),
     ],
     style={"padding": "20px"},
 )
+
+
+# Figure is built on first page visit (not at import), then shared across
+# workers via the on-disk cache until the parquet changes
+@dash.callback(Output("overview-graph", "figure"), Input("overview-graph", "id"))
+def _load_overview_graph(_):
+    return cached_figure("overview_fig", PARQUET_PATH, build_overview_fig)
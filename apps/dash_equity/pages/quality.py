@@ -1,28 +1,67 @@
 import dash
-from dash import html, dcc
+from dash import html, dcc, Input, Output
 import os
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from fig_cache import cached_figure
 
 dash.register_page(__name__, path="/quality", name="Data Quality")
 
 PARQUET_PATH = os.path.join("data", "gold", "financials_panel.parquet")
 
+# Columns read by the balance sheet identity figure (optional ones may be absent)
+BS_COLS = [
+    "TotalAssets", "TotalLiabilities", "ShareholdersEquity",
+    "NoncontrollingInterest", "TemporaryEquity",
+]
+
 # ---------- load ----------
-try:
-    df = pd.read_parquet(PARQUET_PATH)
-except Exception as e:
-    df = pd.DataFrame({"__error__": [str(e)]})
+def _load_table(columns: list[str], path: str = PARQUET_PATH) -> pa.Table:
+    """
+    Memory-mapped, column-projected read of the panel as an Arrow table.
+    Requested columns missing from the file are skipped.
+    """
+    available = set(pq.read_schema(path).names)
+    cols = [c for c in columns if c in available]
+    return pq.read_table(path, columns=cols, memory_map=True)
+
+
+def _missing_share(path: str = PARQUET_PATH) -> pd.Series:
+    """
+    Share of nulls per column, taken from the parquet row-group statistics
+    (no data pages are read). Falls back to a full scan if statistics are absent.
+    """
+    meta = pq.ParquetFile(path, memory_map=True).metadata
+    if meta.num_rows == 0:
+        return pd.Series(dtype="float64")
+
+    nulls: dict[str, int] = {}
+    for i in range(meta.num_row_groups):
+        rg = meta.row_group(i)
+        for j in range(rg.num_columns):
+            col = rg.column(j)
+            stats = col.statistics
+            if stats is None or not stats.has_null_count:
+                return pd.read_parquet(path).isna().mean()
+            nulls[col.path_in_schema] = nulls.get(col.path_in_schema, 0) + stats.null_count
+
+    return pd.Series(nulls, dtype="float64") / meta.num_rows
+
 
 # ---------- figure 1: Missingness ----------
-def build_missingness_fig(_df: pd.DataFrame):
-    if _df.empty:
+def build_missingness_fig(miss_share: pd.Series):
+    if miss_share.empty:
         fig = go.Figure()
         fig.update_layout(title="No data loaded")
         return fig
 
-    miss = _df.isna().mean().sort_values(ascending=False).head(25)
+    miss = miss_share.sort_values(ascending=False).head(25)
     miss = miss.reset_index()
     miss.columns = ["column", "missing_share"]
     fig = px.bar(
@@ -36,9 +75,9 @@ def build_missingness_fig(_df: pd.DataFrame):
     return fig
 
 # ---------- figure 2: Balance sheet identity error ----------
-def build_bs_identity_fig(_df: pd.DataFrame):
+def build_bs_identity_fig(tbl: pa.Table):
     needed = {"TotalAssets", "TotalLiabilities", "ShareholdersEquity"}
-    if not needed.issubset(_df.columns):
+    if not needed.issubset(tbl.column_names):
         fig = go.Figure()
         fig.update_layout(
             title="Balance Sheet Identity",
@@ -49,37 +88,31 @@ def build_bs_identity_fig(_df: pd.DataFrame):
         )
         return fig
 
-    df2 = _df.copy()
-    # parse period if present
-    if "period" in df2.columns:
-        df2["period"] = pd.to_datetime(df2["period"], errors="coerce")
-
-    A = df2["TotalAssets"]
-    L = df2["TotalLiabilities"]
-    E = df2["ShareholdersEquity"]
-    rhs_candidates = [("L+E", L + E)]
-
-    if "NoncontrollingInterest" in df2.columns:
-        rhs_candidates.append(("L+E+NCI", L + E + df2["NoncontrollingInterest"]))
-    if "TemporaryEquity" in df2.columns:
-        rhs_candidates.append(("L+E+TempEq", L + E + df2["TemporaryEquity"]))
-    if ("NoncontrollingInterest" in df2.columns) and ("TemporaryEquity" in df2.columns):
-        rhs_candidates.append(
-            ("L+E+NCI+TempEq", L + E + df2["NoncontrollingInterest"] + df2["TemporaryEquity"])
-        )
+    def _col(name: str) -> pa.ChunkedArray:
+        return pc.cast(tbl[name], pa.float64())
 
-    # compute relative error for each candidate and pick the smallest per row
-    rel_errors = []
-    for label, rhs in rhs_candidates:
-        err = (A - rhs).abs() / A.replace(0, pd.NA)
-        rel_errors.append(err.rename(label))
+    A = _col("TotalAssets")
+    LE = pc.add(_col("TotalLiabilities"), _col("ShareholdersEquity"))
+    rhs_candidates = [LE]  # L+E
 
-    rel_df = pd.concat(rel_errors, axis=1)
-    best_rel_err = rel_df.min(axis=1) * 100.0  # in %
+    has_nci = "NoncontrollingInterest" in tbl.column_names
+    has_te = "TemporaryEquity" in tbl.column_names
+    if has_nci:
+        rhs_candidates.append(pc.add(LE, _col("NoncontrollingInterest")))  # L+E+NCI
+    if has_te:
+        rhs_candidates.append(pc.add(LE, _col("TemporaryEquity")))  # L+E+TempEq
+    if has_nci and has_te:
+        rhs_candidates.append(pc.add(pc.add(LE, _col("NoncontrollingInterest")), _col("TemporaryEquity")))
+
+    # relative error per candidate in Arrow kernels (A == 0 -> null); null-skipping min per row
+    denom = pc.if_else(pc.equal(A, 0), pa.scalar(None, type=pa.float64()), A)
+    rel_errs = [pc.divide(pc.abs(pc.subtract(A, rhs)), denom) for rhs in rhs_candidates]
+    best = pc.min_element_wise(*rel_errs, skip_nulls=True)
+    best_rel_err = best.to_numpy(zero_copy_only=False).astype("float64") * 100.0  # in %, null -> NaN
 
     # histogram of best relative error
     fig = px.histogram(
-        best_rel_err.dropna(),
+        pd.Series(best_rel_err[~np.isnan(best_rel_err)]),
         nbins=40,
         title="Assets vs (Liabilities + Equity) — Best Relative Error (%)",
         labels={"value": "Relative Error (%)"},
@@ -98,16 +131,39 @@ def build_bs_identity_fig(_df: pd.DataFrame):
 
     return fig
 
-missing_fig = build_missingness_fig(df)
-bs_fig = build_bs_identity_fig(df)
+def _build_missing_fig():
+    try:
+        miss_share = _missing_share()
+    except Exception:
+        miss_share = pd.Series(dtype="float64")
+    return build_missingness_fig(miss_share)
+
+def _build_bs_fig():
+    try:
+        tbl = _load_table(BS_COLS)
+    except Exception as e:
+        tbl = pa.table({"__error__": [str(e)]})
+    return build_bs_identity_fig(tbl)
 
 layout = html.Div(
     [
         html.H2("Data Quality"),
         html.P("Quick checks: column completeness and basic balance sheet consistency."),
-        dcc.Graph(figure=missing_fig),
+        dcc.Loading(dcc.Graph(id="quality-missing-graph")),
         html.Hr(),
-        dcc.Graph(figure=bs_fig),
+        dcc.Loading(dcc.Graph(id="quality-bs-graph")),
     ],
     style={"padding": "20px"},
 )
+
+
+# Figures are built on first page visit (not at import), then shared across
+# workers via the on-disk cache until the parquet changes
+@dash.callback(Output("quality-missing-graph", "figure"), Input("quality-missing-graph", "id"))
+def _load_missing_graph(_):
+    return cached_figure("quality_missing_fig", PARQUET_PATH, _build_missing_fig)
+
+
+@dash.callback(Output("quality-bs-graph", "figure"), Input("quality-bs-graph", "id"))
+def _load_bs_graph(_):
+    return cached_figure("quality_bs_fig", PARQUET_PATH, _build_bs_fig)
@@ -43,72 +43,156 @@ def build_reverse_map(canon_map):
 BS_REVERSE_TAG_MAP = build_reverse_map(BS_CANON_MAP)
 
 # ---------- Helper: read a TXT inside a ZIP as a DataFrame (tab-delimited) ----------
-def _read_tab_from_zip(zip_path: Path, member_name: str, usecols=None) -> pd.DataFrame:
+class _Utf8IgnoreStream(io.RawIOBase):
+    """Byte stream over `raw` with invalid UTF-8 dropped, like bytes.decode(errors="ignore")."""
+
+    def __init__(self, raw, chunk_size: int = 16 << 20):
+        import codecs
+
+        self._raw = raw
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._chunk_size = chunk_size
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            data = self._raw.read(self._chunk_size)
+            text = self._decoder.decode(data, final=not data)
+            if not data and not text:
+                return 0
+            self._buf = memoryview(text.encode("utf-8"))
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+def _parse_tab_stream(f, usecols=None):
+    """Header line off the stream, body parsed by pyarrow's CSV reader (all strings)."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    header = f.readline().decode("utf-8", errors="ignore").rstrip("\r\n").split("\t")
+
+    if usecols is None:
+        wanted = header
+    else:
+        # intersect requested with actual, in the file's column order
+        # (include_columns returns columns in list order; pandas usecols kept file order)
+        wanted = [c for c in header if c in set(usecols)]
+        if not wanted:
+            # if none match, just read all to avoid empty frames
+            wanted = header
+
+    return pacsv.read_csv(
+        f,
+        read_options=pacsv.ReadOptions(column_names=header, use_threads=True),
+        parse_options=pacsv.ParseOptions(delimiter="\t"),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=wanted,
+            column_types={c: pa.string() for c in wanted},
+            null_values=["\\N", ""],  # SEC's null marker + empty fields
+            strings_can_be_null=True,
+        ),
+    )
+
+def _read_tab_from_zip(zip_path, member_name: str, usecols=None) -> pd.DataFrame:
     """
     Read a tab-delimited FSDS .txt file from within a ZIP into a pandas DataFrame.
-    - Forces dtype=str (safe), marks \\N as NaN, low_memory=False (consistent types).
+    - `zip_path` may be a path or an already open zipfile.ZipFile (reused as-is).
+    - Single pass over the ZIP member: the header line is read off the stream,
+      the body is parsed by pyarrow's multi-threaded CSV reader.
+    - All columns are read as strings (safe), \\N and empty fields become null.
     - Tolerates missing columns by intersecting requested columns with available ones.
     """
-    import io
-    import pandas as pd
-    import zipfile
-
-    with zipfile.ZipFile(zip_path, "r") as z:
-        with z.open(member_name) as f:
-            text = io.TextIOWrapper(f, encoding="utf-8", errors="ignore")
-
-            # First read only header to discover actual columns
-            header_df = pd.read_csv(
-                text, sep="\t", na_values="\\N", dtype=str,
-                low_memory=False, nrows=0
-            )
-            actual_cols = set(header_df.columns)
-
-    # Reopen to read full content (we consumed the stream above)
-    with zipfile.ZipFile(zip_path, "r") as z:
-        with z.open(member_name) as f:
-            text = io.TextIOWrapper(f, encoding="utf-8", errors="ignore")
-
-            if usecols is None:
-                wanted = None
-            else:
-                # intersect requested with actual
-                wanted = [c for c in usecols if c in actual_cols]
-                if not wanted:
-                    # if none match, just read all to avoid empty frames
-                    wanted = None
-
-            df = pd.read_csv(
-                text,
-                sep="\t",
-                na_values="\\N",
-                dtype=str,
-                low_memory=False,
-                usecols=wanted
-            )
-    return df
-
-def load_fsds_tables(zip_path: Path):
+    import pyarrow as pa
+
+    if not isinstance(zip_path, zipfile.ZipFile):
+        with zipfile.ZipFile(zip_path, "r") as z:
+            return _read_tab_from_zip(z, member_name, usecols=usecols)
+
+    try:
+        with zip_path.open(member_name) as f:
+            table = _parse_tab_stream(f, usecols)
+    except pa.ArrowInvalid as e:
+        # Arrow rejects invalid UTF-8 (e.g. Latin-1 bytes in company names):
+        # re-read with those bytes dropped, like the errors="ignore" text reader
+        if "UTF8" not in str(e):
+            raise
+        with zip_path.open(member_name) as raw:
+            table = _parse_tab_stream(io.BufferedReader(_Utf8IgnoreStream(raw)), usecols)
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+# ---------- Bronze parquet cache for the parsed FSDS tables ----------
+BRONZE_FSDS_ROOT = Path("data") / "bronze" / "fsds"
+_DICT_COLS = ["tag", "uom", "adsh", "form", "fp"]  # repetitive strings -> dictionary encoding
+
+def _write_bronze_parquet(df: pd.DataFrame, path: Path) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(
+        table, path,
+        compression="zstd",
+        use_dictionary=[c for c in _DICT_COLS if c in table.column_names],
+        row_group_size=256_000,
+    )
+
+def load_fsds_tables(zip_path: Path, cache_root: Path | None = BRONZE_FSDS_ROOT, num_filters=None):
     """
     Load only the 3 needed tables: sub, pre, num (minimal columns for BS).
     Returns: sub, pre, num (DataFrames)
+
+    With `cache_root` set, the parsed tables are persisted once as
+    {cache_root}/{yyyyqn}/{sub,pre,num}.parquet and later runs read those
+    instead of re-inflating the ZIP. `num_filters` (pyarrow filter list,
+    e.g. [("qtrs", "=", "0")]) is pushed into the num parquet scan so
+    non-matching row groups are skipped. It requires `cache_root`.
     """
-    # Find the folder inside the zip (e.g., '2025q2/2025q2/')
+    import pyarrow.parquet as pq
+
+    zip_path = Path(zip_path)
+    cache_paths = None
+    if cache_root is not None:
+        cache_dir = Path(cache_root) / zip_path.stem.lower()
+        cache_paths = {k: cache_dir / f"{k}.parquet" for k in ("sub", "pre", "num")}
+        if all(p.exists() for p in cache_paths.values()):
+            sub = pd.read_parquet(cache_paths["sub"])
+            pre = pd.read_parquet(cache_paths["pre"])
+            num = pq.read_table(cache_paths["num"], filters=num_filters, memory_map=True).to_pandas()
+            return sub, pre, num
+
+    # Minimal columns we need now (keeps memory light)
+    sub_cols = ["adsh","cik","name","form","fy","fp","period","filed"]
+    pre_cols = ["adsh","tag","stmt","report","line"]
+    num_cols = ["adsh","tag","ddate","qtrs","uom","value","coreg","dimh"]
+
+    # One ZipFile handle for the directory scan and all three member reads
     with zipfile.ZipFile(zip_path, "r") as z:
+        # Find the folder inside the zip (e.g., '2025q2/2025q2/')
         names = z.namelist()
         # We expect .../sub.txt etc.
         sub_name = next(n for n in names if n.lower().endswith("sub.txt"))
         pre_name = next(n for n in names if n.lower().endswith("pre.txt"))
         num_name = next(n for n in names if n.lower().endswith("num.txt"))
 
-    # Minimal columns we need now (keeps memory light)
-    sub_cols = ["adsh","cik","name","form","fy","fp","period","filed"]
-    pre_cols = ["adsh","tag","stmt","report","line"]
-    num_cols = ["adsh","tag","ddate","qtrs","uom","value","coreg","dimh"]
-
-    sub = _read_tab_from_zip(zip_path, sub_name, usecols=sub_cols)
-    pre = _read_tab_from_zip(zip_path, pre_name, usecols=pre_cols)
-    num = _read_tab_from_zip(zip_path, num_name, usecols=num_cols)
+        sub = _read_tab_from_zip(z, sub_name, usecols=sub_cols)
+        pre = _read_tab_from_zip(z, pre_name, usecols=pre_cols)
+        num = _read_tab_from_zip(z, num_name, usecols=num_cols)
+
+    if cache_paths is not None:
+        _write_bronze_parquet(sub, cache_paths["sub"])
+        _write_bronze_parquet(pre, cache_paths["pre"])
+        _write_bronze_parquet(num, cache_paths["num"])
+        if num_filters is not None:
+            # apply the same filter as a cache hit would, so results don't depend on cache state
+            num = pq.read_table(cache_paths["num"], filters=num_filters, memory_map=True).to_pandas()
+    elif num_filters is not None:
+        raise ValueError("num_filters requires cache_root (filters are applied on the parquet scan).")
 
     return sub, pre, num
 
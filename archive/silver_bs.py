@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 # --- Bronze utilities ---
@@ -14,6 +15,33 @@ from src.config.tag_map_min import UOM_MULTIPLIERS, MONETARY_UOMS
 
 FORMS = {"10-K", "10-K/A", "20-F", "40-F"}
 
+# repetitive string columns -> dictionary encoding; stats enable row-group pruning on read
+_DICT_COLS = ("name", "form", "fp")
+
+def _write_parquet(df: pd.DataFrame, out_path: Path) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        table, out_path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=[c for c in _DICT_COLS if c in table.column_names],
+        row_group_size=64_000,
+        data_page_size=1 << 20,
+        write_statistics=True,
+    )
+
+# low-cardinality string keys: hash/compare on int codes instead of Python strings
+CATEGORY_COLS = ("adsh", "tag", "uom", "form", "fp", "cik")
+
+def _to_category(df: pd.DataFrame, cols=CATEGORY_COLS) -> pd.DataFrame:
+    for c in cols:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df
+
 def _reverse_map(forward: dict[str, list[str]]) -> dict[str, str]:
     """tag -> canon (include the canon name itself as a synonym)."""
     rev = {}
@@ -23,15 +51,23 @@ def _reverse_map(forward: dict[str, list[str]]) -> dict[str, str]:
             rev[t] = canon
     return rev
 
-def _uom_multiplier(u: str) -> float:
-    if pd.isna(u):
-        return 1.0
-    # case-insensitive lookup with graceful fallback to 1.0
-    u_lower = str(u).lower()
-    for k, v in UOM_MULTIPLIERS.items():
-        if u_lower == k.lower():
-            return v
-    return 1.0
+def _pref_rank(forward: dict[str, list[str]]) -> pd.Series:
+    """(canon, tag) -> position of tag in the canon's synonym list (lower = preferred)."""
+    rank = {
+        (canon, t): i
+        for canon, syns in forward.items()
+        for i, t in enumerate(dict.fromkeys([*syns, canon]))  # include canon itself
+    }
+    ser = pd.Series(rank, dtype="int64")
+    ser.index = pd.MultiIndex.from_tuples(ser.index, names=["canon", "tag"])
+    return ser
+
+# BS_CANON is fixed at import: build its lookups once, not per ZIP
+_BS_REVERSE = _reverse_map(BS_CANON)
+_PREF_RANK = _pref_rank(BS_CANON)
+
+# lowercase uom -> multiplier (case-insensitive lookup, unknown units fall back to 1.0)
+_UOM_LUT = {k.lower(): v for k, v in UOM_MULTIPLIERS.items()}
 
 def _filter_fy_at_period(df_long: pd.DataFrame, filings: pd.DataFrame) -> pd.DataFrame:
     """Keep FY-at-period BS facts: qtrs=='0' and ddate == period, annual forms only."""
@@ -52,8 +88,8 @@ def _normalize_values(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     df = df.copy()
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df["value"] = df["value"] * df["uom"].map(_uom_multiplier)
+    mult = df["uom"].astype("string").str.lower().map(_UOM_LUT).fillna(1.0).astype("float64")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce") * mult
     return df.dropna(subset=["value"])
 
 def _resolve_collisions(mapped: pd.DataFrame, forward_map: dict[str, list[str]]) -> pd.DataFrame:
@@ -66,17 +102,13 @@ def _resolve_collisions(mapped: pd.DataFrame, forward_map: dict[str, list[str]])
     if mapped.empty:
         return mapped
 
-    # build a per-canon ranking for synonyms (lower rank = better)
-    pref_rank = {}
-    for canon, syns in forward_map.items():
-        ordered = list(dict.fromkeys([*syns, canon]))  # include canon itself
-        pref_rank.update({(canon, t): i for i, t in enumerate(ordered)})
+    # per-canon ranking for synonyms (lower rank = better); precomputed for BS_CANON
+    rank_ser = _PREF_RANK if forward_map is BS_CANON else _pref_rank(forward_map)
+    keys = pd.MultiIndex.from_arrays([mapped["canon"].values, mapped["tag"].values], names=["canon", "tag"])
 
     mapped = mapped.copy()
-    mapped["__rank"] = mapped.apply(
-        lambda r: pref_rank.get((r["canon"], r["tag"]), 10_000), axis=1
-    )
-    mapped["__abs"] = mapped["value"].abs()
+    mapped["__rank"] = rank_ser.reindex(keys).fillna(10_000).to_numpy()
+    mapped["__abs"] = np.abs(mapped["value"].to_numpy())
 
     # sort so the preferred choice comes first, then drop duplicates
     mapped = mapped.sort_values(["adsh", "canon", "__rank", "__abs"], ascending=[True, True, True, False])
@@ -128,7 +160,7 @@ def build_bs_silver_for_zip(
         bs_long_path.parent.mkdir(parents=True, exist_ok=True)
         extract_balance_sheets(zip_path).to_parquet(bs_long_path, index=False)
 
-    bs_long = pd.read_parquet(bs_long_path)
+    bs_long = _to_category(pd.read_parquet(bs_long_path))
 
     # --- Silver transforms ---
     # 1) FY-at-period + monetary only
@@ -138,12 +170,20 @@ def build_bs_silver_for_zip(
 
     # 2) Map tags -> canon
     forward = BS_CANON
-    reverse = _reverse_map(forward)
+    reverse = _BS_REVERSE
     mapped = bs.copy()
     mapped["canon"] = mapped["tag"].map(reverse)
+    mapped["__is_mapped"] = mapped["canon"].notna()
 
-    unknown = mapped[mapped["canon"].isna()].copy()
-    mapped = mapped[~mapped["canon"].isna()].copy()
+    # per-filing coverage in one pass over all considered facts (mapped + unknown)
+    coverage = (
+        mapped.groupby("adsh", observed=True)
+        .agg(mapped_count=("__is_mapped", "sum"), total_considered=("__is_mapped", "size"))
+        .reset_index()
+    )
+
+    unknown = mapped.loc[~mapped["__is_mapped"], ["adsh", "tag"]]
+    mapped = mapped[mapped["__is_mapped"]].drop(columns="__is_mapped")
 
     # 3) Attach filing metadata (for the final wide table)
     meta_cols = ["adsh", "cik", "name", "fy", "filed", "period", "sic"]
@@ -154,20 +194,11 @@ def build_bs_silver_for_zip(
     mapped = _resolve_collisions(mapped, forward)
 
     # 5) Coverage & unknown-tag logs
-    # per-filing coverage after all filters
-    cov_mapped = mapped.groupby("adsh")["tag"].count().rename("mapped_count")
-    considered = pd.concat([mapped[["adsh", "tag"]], unknown[["adsh", "tag"]]], axis=0)
-    cov_total = considered.groupby("adsh")["tag"].count().rename("total_considered")
-    coverage = (
-        pd.concat([cov_mapped, cov_total], axis=1)
-        .fillna(0)
-        .reset_index()
-    )
     coverage["coverage_pct"] = coverage["mapped_count"].div(coverage["total_considered"]).where(coverage["total_considered"] > 0, 0.0)
     coverage = filings_meta.merge(coverage, on="adsh", how="left").fillna({"mapped_count": 0, "total_considered": 0, "coverage_pct": 0.0})
 
     unk_freq = (
-        unknown.groupby("tag")["adsh"].nunique()
+        unknown.groupby("tag", observed=True)["adsh"].nunique()
         .sort_values(ascending=False)
         .rename("filings_with_unknown")
         .reset_index()
@@ -176,7 +207,7 @@ def build_bs_silver_for_zip(
     # 6) Pivot wide (companies/filings in rows)
     index_cols = ["adsh", "cik", "name", "fy", "filed", "period", "sic"]
     wide = (
-        mapped.pivot_table(index=index_cols, columns="canon", values="value", aggfunc="first")
+        mapped.pivot_table(index=index_cols, columns="canon", values="value", aggfunc="first", observed=True)
         .reset_index()
     )
     wide.columns.name = None
@@ -193,7 +224,7 @@ def build_bs_silver_for_zip(
         wide_out = silver_root / "bs_wide_canonical.parquet"
         cov_out = (project_root / "logs" / "coverage" / f"bs_{year_quarter}_coverage.csv")
         unk_out = (project_root / "logs" / "coverage" / f"bs_{year_quarter}_unknown_tags.csv")
-        wide.to_parquet(wide_out, index=False)
+        _write_parquet(wide, wide_out)
         coverage.to_csv(cov_out, index=False)
         unk_freq.to_csv(unk_out, index=False)
 
@@ -3,8 +3,9 @@
 from pathlib import Path
 import pandas as pd
 from .fsds_loader import load_fsds_from_zip
-# from .tag_map_shares import SHARE_TAG_TO_CANON
+from .tag_map_shares import SHARE_TAG_TO_CANON
 import importlib
+import os
 from . import tag_map_shares as tm
 
 
@@ -20,6 +21,12 @@ def build_silver_shares(zip_path: Path, out_path: Path | None = None) -> pd.Data
     dfs = load_fsds_from_zip(zip_path)
     sub, pre, num = dfs["sub"], dfs["pre"], dfs["num"]
 
+    # low-cardinality string keys -> category (int-code hashing in merges/pivots)
+    for frame, cols in ((num, ("adsh", "tag", "uom")), (sub, ("adsh", "form", "fp", "cik"))):
+        for c in cols:
+            if c in frame.columns:
+                frame[c] = frame[c].astype("category")
+
     # ---- helper to filter & pivot for one statement type ----
     def _pivot_shares(stmt_key: str, qtrs_needed: str) -> pd.DataFrame:
         # 1) which (adsh, tag) belong to this statement?
@@ -27,21 +34,25 @@ def build_silver_shares(zip_path: Path, out_path: Path | None = None) -> pd.Data
         if stmt.empty:
             return pd.DataFrame()
 
-        # 2) numeric facts joined to those tags
-        df = num.merge(stmt, on=["adsh","tag"], how="inner")
+        # 2) keep only shares unit and desired qtrs BEFORE joining,
+        #    so the (adsh, tag) hash join runs on the small share-fact subset
+        facts = num.loc[(num["uom"].str.lower() == "shares") & (num["qtrs"] == qtrs_needed)]
+        df = facts.merge(stmt, on=["adsh","tag"], how="inner")
 
-        # 3) keep only shares unit, desired qtrs, and align on FY period
+        # 3) align on FY period
         #    sub.period is the official FY end date; we keep facts at that date
-        df = df[(df["uom"].str.lower() == "shares") & (df["qtrs"] == qtrs_needed)]
-        df = df.merge(sub[["adsh","period"]], on="adsh", how="left")
+        #    (inner: rows without a period would be dropped by the ddate filter anyway)
+        df = df.merge(sub[["adsh","period"]], on="adsh", how="inner")
         df = df[df["ddate"] == df["period"]].copy()
 
         if df.empty:
             return pd.DataFrame()
 
         # 4) map tags → canonical; drop unknowns (log later if you like)
-        importlib.reload(tm)
-        MAP = tm.SHARE_TAG_TO_CANON
+        MAP = SHARE_TAG_TO_CANON
+        if os.getenv("DEV_RELOAD_TAGMAP"):
+            # dev only: pick up edits to tag_map_shares without restarting the kernel
+            MAP = importlib.reload(tm).SHARE_TAG_TO_CANON
         df["tag"] = df["tag"].astype(str).str.strip()
         df["canon"] = df["tag"].map(MAP)
         log_unmapped_tags(df, stmt_key, zip_path.name)
@@ -51,7 +62,7 @@ def build_silver_shares(zip_path: Path, out_path: Path | None = None) -> pd.Data
         df["value"] = pd.to_numeric(df["value"], errors="coerce")
         df = df.dropna(subset=["value"]).drop_duplicates(subset=["adsh","canon"], keep="first")
 
-        wide = df.pivot_table(index="adsh", columns="canon", values="value", aggfunc="first").reset_index()
+        wide = df.pivot_table(index="adsh", columns="canon", values="value", aggfunc="first", observed=True).reset_index()
         return wide
 
     # Build BS (instant) and IS (duration) shares
@@ -90,18 +101,24 @@ def build_silver_shares(zip_path: Path, out_path: Path | None = None) -> pd.Data
 # src/data_prep/silver_shares.py
 
 
+UNMAPPED_LOG_ROOT = Path("logs") / "unmapped_shares"
+
+
 def log_unmapped_tags(df: pd.DataFrame, stmt_key: str, zip_name: str):
     """
-    Log unmapped share tags into logs/unmapped_shares.csv for later inspection.
-    Appends (tag, stmt, count, uom, zip_name) if tag not in SHARE_TAG_TO_CANON.
+    Log unmapped share tags into the logs/unmapped_shares/ parquet dataset for later inspection.
+    Appends (tag, uom, count, stmt, source_zip) rows for tags not in SHARE_TAG_TO_CANON.
+
+    Writes are append-only (one new file per call, partitioned by source_zip);
+    de-duplication happens at read time in read_unmapped().
     """
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    log_path = log_dir / "unmapped_shares.csv"
+    import pyarrow as pa
+    import pyarrow.parquet as pq
 
     # Count how many times each unmapped tag appeared
     unmapped = (
         df.loc[~df["tag"].isin(SHARE_TAG_TO_CANON.keys()), ["tag", "uom"]]
+        .astype(str)
         .value_counts()
         .reset_index(name="count")
     )
@@ -111,11 +128,19 @@ def log_unmapped_tags(df: pd.DataFrame, stmt_key: str, zip_name: str):
     unmapped["stmt"] = stmt_key
     unmapped["source_zip"] = zip_name
 
-    # Append or create the CSV
-    if log_path.exists():
-        old = pd.read_csv(log_path)
-        combined = pd.concat([old, unmapped], ignore_index=True)
-        combined.drop_duplicates(subset=["tag", "stmt", "uom", "source_zip"], inplace=True)
-        combined.to_csv(log_path, index=False)
-    else:
-        unmapped.to_csv(log_path, index=False)
+    UNMAPPED_LOG_ROOT.mkdir(parents=True, exist_ok=True)
+    pq.write_to_dataset(
+        pa.Table.from_pandas(unmapped, preserve_index=False),
+        root_path=str(UNMAPPED_LOG_ROOT),
+        partition_cols=["source_zip"],
+        compression="zstd",
+    )
+
+
+def read_unmapped(root: Path = UNMAPPED_LOG_ROOT) -> pd.DataFrame:
+    """Read the unmapped-shares log, de-duplicated on (tag, stmt, uom, source_zip)."""
+    if not Path(root).exists():
+        return pd.DataFrame(columns=["tag", "uom", "count", "stmt", "source_zip"])
+    log = pd.read_parquet(root)
+    log["source_zip"] = log["source_zip"].astype(str)
+    return log.drop_duplicates(subset=["tag", "stmt", "uom", "source_zip"]).reset_index(drop=True)
@@ -1,7 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from .parquet_io import write_parquet
+
 def build_annual_10k_panel(
     panel_path: str | Path = "data/gold/financials_panel.parquet",
     out_path: str | Path | None = "data/enriched/financials_annual.parquet",
@@ -28,27 +31,34 @@ def build_annual_10k_panel(
     pd.DataFrame
         Annual-only panel, one row per (cik, fy).
     """
+    import pyarrow.parquet as pq
+
     panel_path = Path(panel_path)
-    df = pd.read_parquet(panel_path)
+    forms_keep = {"10-K", "10-K/A"}
+
+    # Push the form filter into the parquet scan (row groups without 10-K rows are skipped)
+    if "form" in pq.read_schema(panel_path).names:
+        df = pd.read_parquet(panel_path, filters=[("form", "in", sorted(forms_keep))])
+    else:
+        df = pd.read_parquet(panel_path)
 
     if df.empty:
         if out_path is not None:
             out_path = Path(out_path)
             out_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_parquet(out_path, index=False)
+            write_parquet(df, out_path)
         return df
 
     # --- Basic filtering: 10-K + 10-K/A only ---
     if "form" not in df.columns:
         raise ValueError("Expected column 'form' in financials_panel, but it is missing.")
 
-    forms_keep = {"10-K", "10-K/A"}
     df = df[df["form"].isin(forms_keep)].copy()
     if df.empty:
         if out_path is not None:
             out_path = Path(out_path)
             out_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_parquet(out_path, index=False)
+            write_parquet(df, out_path)
         return df
 
     # --- Ensure fy and cik are usable ---
@@ -78,18 +88,25 @@ def build_annual_10k_panel(
     form_rank_map = {"10-K": 0, "10-K/A": 1}
     df["__form_rank"] = df["form"].map(form_rank_map).fillna(0)
 
-    # --- Sort so that the "best" row per (cik, fy) is last ---
-    # Priority:
-    #   1. __is_fy (True after False)  -> annual over non-annual / weird fp
-    #   2. filed date (latest)
+    # --- Pick the "best" row per (cik, fy) via groupby-argmax (no full-frame sort) ---
+    # Priority, packed into one int64 score:
+    #   1. __is_fy (True over False)  -> annual over non-annual / weird fp
+    #   2. filed date (latest; missing filed treated as oldest)
     #   3. form_rank (10-K/A > 10-K)
-    df = df.sort_values(
-        ["cik", "fy", "__is_fy", "filed", "__form_rank"],
-        ascending=[True, True, True, True, True]  # we keep 'last' below
+    #   4. row position (last row wins, as the old sort + drop_duplicates(keep="last") did)
+    df = df.reset_index(drop=True)
+    filed_d = (
+        df["filed"].fillna(pd.Timestamp("1900-01-01"))
+        .to_numpy(dtype="datetime64[D]").astype("int64")
     )
+    priority = (
+        (df["__is_fy"].astype("int64") * 10**6 + filed_d) * 2
+        + df["__form_rank"].astype("int64")
+    ) * len(df) + np.arange(len(df))
 
     # --- Collapse to one row per (cik, fy) ---
-    df_annual = df.drop_duplicates(subset=["cik", "fy"], keep="last").copy()
+    best_idx = priority.groupby([df["cik"], df["fy"]]).idxmax()
+    df_annual = df.loc[best_idx].copy()
 
     # Clean up helper columns
     df_annual = df_annual.drop(columns=[c for c in ["__is_fy", "__form_rank"] if c in df_annual.columns])
@@ -98,6 +115,6 @@ def build_annual_10k_panel(
     if out_path is not None:
         out_path = Path(out_path)
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        df_annual.to_parquet(out_path, index=False)
+        write_parquet(df_annual, out_path)
 
     return df_annual
@@ -2,12 +2,14 @@ import pandas as pd
 import numpy as np
 import yfinance as yf
 
+from .parquet_io import write_parquet
+
 # =========================================================
 # 0. QUICK DIAGNOSTICS: TICKERS + YFINANCE CONNECTIVITY
 # =========================================================
 
 def debug_yfinance_and_tickers(input_parquet: str, ticker_col: str = "ticker", n_sample: int = 5):
-    df_debug = pd.read_parquet(input_parquet).copy()
+    df_debug = pd.read_parquet(input_parquet, filters=[(ticker_col, "!=", "DELISTED")])
     df_debug = df_debug[df_debug[ticker_col].notna()].copy()
     df_debug = df_debug[df_debug[ticker_col] != "DELISTED"].copy()
     df_debug[ticker_col] = df_debug[ticker_col].astype(str).str.strip()
@@ -29,16 +31,80 @@ def debug_yfinance_and_tickers(input_parquet: str, ticker_col: str = "ticker", n
     sample_tickers = df_debug[ticker_col].drop_duplicates().head(n_sample).tolist()
     print(f"\nTesting yfinance with {n_sample} tickers from your file:", sample_tickers)
 
+    # One batched request for all sample tickers (yfinance threads the per-symbol fetches)
+    try:
+        df_all = yf.download(sample_tickers, period="5d", progress=False, group_by="ticker", threads=True)
+    except Exception as e:
+        print(f"Batch download ERROR {e}")
+        df_all = None
+
     for t in sample_tickers:
-        try:
-            df_t = yf.download(t, period="5d", progress=False, group_by="column")
-            print(f"Ticker {t}: shape {getattr(df_t, 'shape', None)}")
-        except Exception as e:
-            print(f"Ticker {t}: ERROR {e}")
+        if df_all is None or df_all.empty or t not in df_all.columns.get_level_values(0):
+            print(f"Ticker {t}: no data returned")
+            continue
+        df_t = df_all[t].dropna(how="all")
+        print(f"Ticker {t}: shape {df_t.shape}")
 
     return df_debug
 
 
+YF_CHUNK_SIZE = 20  # symbols per yf.download call
+
+
+def _ticker_slice(data: pd.DataFrame, t: str) -> pd.DataFrame | None:
+    """Per-ticker OHLCV frame out of a multi-ticker yf.download(group_by="ticker") result."""
+    if data is None or data.empty:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        if t not in data.columns.get_level_values(0):
+            return None
+        return data[t].dropna(how="all")
+    return data
+
+
+def _price_frame(data: pd.DataFrame | None, t: str) -> pd.DataFrame | None:
+    """Rename one ticker's yfinance OHLCV to px_* columns; None if unusable."""
+    if data is None or data.empty:
+        print(f"[WARN] No price data for {t}, skipping.")
+        return None
+
+    if isinstance(data.columns, pd.MultiIndex):
+        # single-ticker download with a (field, ticker) header
+        data = data.droplevel(-1, axis=1)
+
+    data = data.reset_index()
+    cols = list(data.columns)
+
+    # Choose price column: Adj Close > Close
+    if "Adj Close" in cols:
+        px_col = "Adj Close"
+    elif "Adj_Close" in cols:
+        px_col = "Adj_Close"
+    elif "Close" in cols:
+        px_col = "Close"
+    else:
+        print(f"[WARN] {t}: No Adj Close/Close column. Columns: {cols}")
+        return None
+
+    frame_cols = {
+        "Date": "px_date",
+        "Open": "px_open",
+        "High": "px_high",
+        "Low": "px_low",
+        "Close": "px_close",
+        px_col: "px_adj_close",
+        "Volume": "px_volume",
+    }
+
+    available_cols = [c for c in frame_cols.keys() if c in data.columns]
+    frame = data[available_cols].copy()
+    rename_map = {c: frame_cols[c] for c in available_cols}
+    frame = frame.rename(columns=rename_map)
+
+    frame["px_ticker"] = t
+    return frame
+
+
 # =========================================================
 # 1. MAIN FUNCTION: ATTACH OHLCV TO FUNDAMENTALS
 # =========================================================
@@ -66,32 +132,34 @@ def attach_ohlcv_to_fundamentals(
     # ---------------------------------------------------------
     # 1. Load fundamentals and clean tickers
     # ---------------------------------------------------------
-    df = pd.read_parquet(input_parquet).copy()
+    # DELISTED (and null) tickers are dropped in the parquet scan
+    df = pd.read_parquet(input_parquet, filters=[(ticker_col, "!=", "DELISTED")])
 
-    # Drop missing / DELISTED tickers
-    df = df[df[ticker_col].notna()].copy()
-    df = df[df[ticker_col] != "DELISTED"].copy()
-
-    # Ensure ticker is clean string and stripped
-    df[ticker_col] = df[ticker_col].astype(str).str.strip()
-
-    print("Fundamentals rows after ticker cleaning:", df.shape)
-    print("Unique tickers:", df[ticker_col].nunique())
+    # Drop missing / DELISTED tickers (row-exact; the scan filter works per row group)
+    ticker_ok = df[ticker_col].notna() & (df[ticker_col] != "DELISTED")
 
     # Ensure datetime
-    df[period_col] = pd.to_datetime(df[period_col], errors="coerce")
-    df[filed_col]  = pd.to_datetime(df[filed_col],  errors="coerce")
-
-    # Drop rows with missing period
-    df = df[df[period_col].notna()].copy()
+    period = pd.to_datetime(df[period_col], errors="coerce")
+    filed  = pd.to_datetime(df[filed_col],  errors="coerce")
 
     # ---------------------------------------------------------
     # 2. Drop any impossible filing < period cases
     # ---------------------------------------------------------
-    invalid_mask = (df[filed_col].notna()) & (df[filed_col] < df[period_col])
-    if invalid_mask.any():
-        print(f"Warning: found {invalid_mask.sum()} rows with filed < period. Dropping them.")
-        df = df[~invalid_mask].copy()
+    invalid_mask = filed.notna() & (filed < period)
+    if (invalid_mask & ticker_ok).any():
+        print(f"Warning: found {(invalid_mask & ticker_ok).sum()} rows with filed < period. Dropping them.")
+
+    # One combined row filter (missing period, bad ticker, filed < period) -> a single copy
+    keep = ticker_ok & period.notna() & ~invalid_mask
+    df = df.loc[keep].reset_index(drop=True)
+    df[period_col] = period[keep].to_numpy()
+    df[filed_col]  = filed[keep].to_numpy()
+
+    # Ensure ticker is clean string and stripped; categorical for the groupbys below
+    df[ticker_col] = df[ticker_col].astype(str).str.strip().astype("category")
+
+    print("Fundamentals rows after cleaning:", df.shape)
+    print("Unique tickers:", df[ticker_col].nunique())
 
     # ---------------------------------------------------------
     # 3. Compute anchor_date based on your rule
@@ -99,14 +167,16 @@ def attach_ohlcv_to_fundamentals(
     df["days_diff"] = (df[filed_col] - df[period_col]).dt.days
     df.loc[df["days_diff"].isna(), "days_diff"] = 9999  # force to "late" branch if filed is NaN
 
-    timely_mask = (df["days_diff"] >= 0) & (df["days_diff"] <= max_filing_delay_days)
+    timely_mask = ((df["days_diff"] >= 0) & (df["days_diff"] <= max_filing_delay_days)).to_numpy()
 
+    # datetime64 arithmetic on the raw buffers (no Timedelta broadcast, no object array)
+    filed_ns = df[filed_col].to_numpy(dtype="datetime64[ns]")
+    period_ns = df[period_col].to_numpy(dtype="datetime64[ns]")
     df["anchor_date"] = np.where(
         timely_mask,
-        df[filed_col] + pd.Timedelta(days=1),                     # timely filing → filed + 1 day
-        df[period_col] + pd.Timedelta(days=fallback_days_after_period),  # very late → period + 90 days
+        filed_ns + np.timedelta64(1, "D"),                                 # timely filing → filed + 1 day
+        period_ns + np.timedelta64(fallback_days_after_period, "D"),       # very late → period + 90 days
     )
-    df["anchor_date"] = pd.to_datetime(df["anchor_date"])
 
     print(
         "Anchor date range:",
@@ -132,64 +202,50 @@ def attach_ohlcv_to_fundamentals(
     # ---------------------------------------------------------
     # 5. Fetch OHLCV from yfinance for all tickers
     # ---------------------------------------------------------
-    unique_tickers = sorted(df[ticker_col].unique())
+    unique_tickers = sorted(df[ticker_col].unique().tolist())
     print("Number of unique tickers to download:", len(unique_tickers))
 
     price_frames = []
     failed_tickers = []
 
-    for t in unique_tickers:
-        df_t = df[df[ticker_col] == t]
-        if df_t["anchor_date"].isna().all():
-            continue
+    # Anchor-date bounds per ticker in one groupby pass (tickers without anchors drop out)
+    bounds = (
+        df.dropna(subset=["anchor_date"])
+        .groupby(ticker_col, observed=True)["anchor_date"]
+        .agg(min_d="min", max_d="max")
+    )
+    tickers_to_fetch = bounds.index.tolist()
 
-        start = (df_t["anchor_date"].min() - pd.Timedelta(days=price_window_before_anchor)).strftime("%Y-%m-%d")
-        end   = (df_t["anchor_date"].max() + pd.Timedelta(days=price_window_after_anchor)).strftime("%Y-%m-%d")
+    # Fetched in chunks of YF_CHUNK_SIZE symbols per request
+    # (yfinance threads the per-symbol fetches inside each call)
+    for i in range(0, len(tickers_to_fetch), YF_CHUNK_SIZE):
+        chunk = tickers_to_fetch[i:i + YF_CHUNK_SIZE]
+        chunk_bounds = bounds.iloc[i:i + YF_CHUNK_SIZE]
+
+        # One window covering every ticker in the chunk; merge_asof + lag filter trim it later
+        start = chunk_bounds["min_d"].min() - pd.Timedelta(days=price_window_before_anchor)
+        end   = chunk_bounds["max_d"].max() + pd.Timedelta(days=price_window_after_anchor)
 
         try:
-            data = yf.download(t, start=start, end=end, progress=False, group_by="column")
+            data = yf.download(chunk, start=start, end=end, progress=False, group_by="ticker", threads=True)
         except Exception as e:
-            print(f"[ERROR] Downloading {t}: {e}")
-            failed_tickers.append(t)
-            continue
-
-        if data is None or data.empty:
-            print(f"[WARN] No price data for {t}, skipping.")
-            failed_tickers.append(t)
-            continue
-
-        data = data.reset_index()
-        cols = list(data.columns)
-
-        # Choose price column: Adj Close > Close
-        if "Adj Close" in cols:
-            px_col = "Adj Close"
-        elif "Adj_Close" in cols:
-            px_col = "Adj_Close"
-        elif "Close" in cols:
-            px_col = "Close"
-        else:
-            print(f"[WARN] {t}: No Adj Close/Close column. Columns: {cols}")
-            failed_tickers.append(t)
-            continue
-
-        frame_cols = {
-            "Date": "px_date",
-            "Open": "px_open",
-            "High": "px_high",
-            "Low": "px_low",
-            "Close": "px_close",
-            px_col: "px_adj_close",
-            "Volume": "px_volume",
-        }
-
-        available_cols = [c for c in frame_cols.keys() if c in data.columns]
-        frame = data[available_cols].copy()
-        rename_map = {c: frame_cols[c] for c in available_cols}
-        frame = frame.rename(columns=rename_map)
-
-        frame["px_ticker"] = t
-        price_frames.append(frame)
+            print(f"[WARN] Batch download failed for {len(chunk)} tickers ({e}); retrying one by one.")
+            data = None
+
+        for t in chunk:
+            if data is not None:
+                frame = _price_frame(_ticker_slice(data, t), t)
+            else:
+                try:
+                    frame = _price_frame(yf.download(t, start=start, end=end, progress=False, group_by="column"), t)
+                except Exception as e:
+                    print(f"[ERROR] Downloading {t}: {e}")
+                    frame = None
+
+            if frame is None:
+                failed_tickers.append(t)
+                continue
+            price_frames.append(frame)
 
     print("\nTickers with failed / missing downloads:", len(failed_tickers))
     if failed_tickers:
@@ -210,20 +266,34 @@ def attach_ohlcv_to_fundamentals(
     # ---------------------------------------------------------
     # 6. Merge fundamentals with prices (first trading day ON OR AFTER anchor_date)
     # ---------------------------------------------------------
-    df = df.sort_values([ticker_col, "anchor_date"])
-
-    merged = pd.merge_asof(
-        df,
-        px_all,
-        left_on="anchor_date",
-        right_on="px_date",
-        left_by=ticker_col,
-        right_by="px_ticker",
-        direction="forward",  # skips weekends/holidays → next trading day
+    df = df.sort_values([ticker_col, "anchor_date"]).reset_index(drop=True)
+
+    # Per ticker, binary-search each anchor in the sorted trading dates
+    # (side="left" -> first px_date >= anchor; skips weekends/holidays → next trading day)
+    px_all = px_all.reset_index(drop=True)
+    px_dates = px_all["px_date"].to_numpy(dtype="datetime64[ns]")
+    anchors = df["anchor_date"].to_numpy(dtype="datetime64[ns]")
+    px_rows_by_ticker = px_all.groupby("px_ticker", sort=False).indices
+
+    match = np.full(len(df), -1, dtype=np.int64)
+    for t, rows in df.groupby(ticker_col, sort=False, observed=True).indices.items():
+        px_rows = px_rows_by_ticker.get(t)
+        if px_rows is None:
+            continue
+        i = np.searchsorted(px_dates[px_rows], anchors[rows], side="left")
+        found = i < len(px_rows)
+        match[rows[found]] = px_rows[i[found]]
+
+    # Rows without any later price would fail the lag filter below anyway
+    hit = match >= 0
+    merged = pd.concat(
+        [
+            df.loc[hit].reset_index(drop=True),
+            px_all.drop(columns=["px_ticker"]).iloc[match[hit]].reset_index(drop=True),
+        ],
+        axis=1,
     )
 
-    merged = merged.drop(columns=["px_ticker"])
-
     merged["px_lag_days"] = (merged["px_date"] - merged["anchor_date"]).dt.days
 
     lag_mask = (merged["px_lag_days"] >= 0) & (merged["px_lag_days"] <= max_price_lag_days)
@@ -239,7 +309,7 @@ def attach_ohlcv_to_fundamentals(
     # ---------------------------------------------------------
     # 7. Save to parquet and return
     # ---------------------------------------------------------
-    merged.to_parquet(output_parquet, index=False)
+    write_parquet(merged, output_parquet)
     print(f"Saved enriched dataset with OHLCV to: {output_parquet}")
 
     return merged
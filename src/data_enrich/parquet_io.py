@@ -0,0 +1,29 @@
+from __future__ import annotations
+from pathlib import Path
+import pandas as pd
+
+
+def write_parquet(df: pd.DataFrame, path: str | Path, row_group_size: int = 131_072) -> None:
+    """
+    Write `df` as Parquet with the enrichment-layer defaults:
+      - ZSTD level 3 (smaller than Snappy at similar decode speed)
+      - dictionary encoding for all columns (pyarrow falls back per column if it doesn't pay off)
+      - row-group min/max statistics, so readers can prune with `filters=`
+    """
+    import pyarrow as pa
+
+    write_arrow_parquet(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=row_group_size)
+
+
+def write_arrow_parquet(table, path: str | Path, row_group_size: int = 131_072) -> None:
+    """Same as write_parquet, for a pyarrow.Table that never went through pandas."""
+    import pyarrow.parquet as pq
+
+    pq.write_table(
+        table, str(path),
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=True,
+        row_group_size=row_group_size,
+        write_statistics=True,
+    )
@@ -2,6 +2,9 @@
 
 from pathlib import Path
 import pandas as pd
+import pyarrow.parquet as pq
+
+from .parquet_io import write_arrow_parquet
 
 
 def map_sic_to_office_industry(
@@ -44,12 +47,46 @@ def map_sic_to_office_industry(
         dtype={"sic": "Int64"},
     )
 
-    df_out = df.copy()
-    df_out["sic"] = df_out["sic"].astype("Int64")
+    # merge already returns a new frame: only the join key is re-typed, no full copy
+    if df["sic"].dtype != mapping["sic"].dtype:
+        df = df.assign(sic=df["sic"].astype("Int64"))
+
+    return df.merge(mapping, how="left", on="sic")
+
+
+def _attach_sic_arrow(tbl, sic_mapping_path: Path):
+    """
+    Arrow-side version of map_sic_to_office_industry: left-join the SIC mapping CSV
+    onto an Arrow table without converting either side to pandas.
+    Lookup is index_in + take, so row order is kept and no hash-join copy is made.
+    Existing mapping columns (e.g. from an earlier run) are replaced.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
+    if "sic" not in tbl.column_names:
+        return tbl
 
-    df_out = df_out.merge(mapping, how="left", on="sic")
+    mapping = pacsv.read_csv(
+        sic_mapping_path,
+        convert_options=pacsv.ConvertOptions(column_types={"sic": pa.int64()}),
+    )
 
-    return df_out
+    sic = pc.cast(tbl["sic"], pa.int64())
+    tbl = tbl.set_column(tbl.column_names.index("sic"), "sic", sic)
+
+    # position of each row's sic in the mapping (null when unmapped -> null attributes)
+    pos = pc.index_in(sic, value_set=mapping["sic"])
+    for name in mapping.column_names:
+        if name == "sic":
+            continue
+        values = mapping[name].take(pos)
+        if name in tbl.column_names:
+            tbl = tbl.set_column(tbl.column_names.index(name), name, values)
+        else:
+            tbl = tbl.append_column(name, values)
+    return tbl
 
 
 def build_financials_panel_with_sic(
@@ -86,17 +123,21 @@ def build_financials_panel_with_sic(
     if not parquet_in.exists():
         raise FileNotFoundError(f"Input parquet not found: {parquet_in}")
 
-    # 1) Load fundamentals panel
-    df = pd.read_parquet(parquet_in)
+    sic_mapping_path = Path(sic_mapping_path)
+    if not sic_mapping_path.exists():
+        raise FileNotFoundError(f"SIC mapping CSV not found: {sic_mapping_path}")
+
+    # 1) Load fundamentals panel (stays in Arrow end to end, no pandas round trip)
+    tbl = pq.read_table(parquet_in, memory_map=True)
 
     # 2) Attach SIC → office / industry_title
-    df = map_sic_to_office_industry(df, sic_mapping_path=sic_mapping_path)
+    tbl = _attach_sic_arrow(tbl, sic_mapping_path)
 
     # Ensure output directory exists
     parquet_out.parent.mkdir(parents=True, exist_ok=True)
 
     # 3) Save final enriched parquet
-    df.to_parquet(parquet_out, index=False)
+    write_arrow_parquet(tbl, parquet_out)
     print(f"[INFO] Saved enriched panel with SIC to: {parquet_out}")
 
     return parquet_out
@@ -1,8 +1,12 @@
 from pathlib import Path
+import functools
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import yfinance as yf
 
+from .parquet_io import write_parquet
+
 
 # Very slow function - run only for required CIKs that need ticker mapped
 def attach_tickers_to_fundamentals(
@@ -15,6 +19,7 @@ def attach_tickers_to_fundamentals(
     date_col: str | None = None,    # e.g. "period" if you have it
     date_window_days: int = 2,      # +/- days around min/max date
     yf_test_period: str = "5d",     # used if date_col is missing
+    max_workers: int = 16,          # concurrent yfinance probes
     verbose: bool = False,
 ) -> pd.DataFrame:
     """
@@ -49,6 +54,8 @@ def attach_tickers_to_fundamentals(
         +/- days around min and max dates for each CIK when querying yfinance.
     yf_test_period : str, optional
         Fallback yfinance period (e.g. '1y', '5d') if date_col is not provided.
+    max_workers : int, optional
+        Number of threads used to probe candidate tickers on yfinance concurrently.
     verbose : bool, optional
         If True, prints diagnostic info.
 
@@ -74,7 +81,8 @@ def attach_tickers_to_fundamentals(
         raw = json.load(f)
 
     # JSON is dict-of-dicts like {"0": {"cik_str": ..., "ticker": ..., "title": ...}, ...}
-    map_df = pd.DataFrame(raw).T.reset_index(drop=True)
+    # from_records builds typed columns directly (no object frame + transpose)
+    map_df = pd.DataFrame.from_records(list(raw.values()))
 
     # Standardise mapping columns
     if "cik_str" not in map_df.columns:
@@ -122,9 +130,10 @@ def attach_tickers_to_fundamentals(
     )
 
     # --- 5) Init columns in fundamentals ---
-    df["ticker"] = pd.NA
-    df["ticker_duplicates"] = pd.NA
-    df["ticker_instance"] = pd.NA
+    # typed string column for tickers; list columns stay object but start as None (not pd.NA)
+    df["ticker"] = pd.array([None] * len(df), dtype="string")
+    df["ticker_duplicates"] = pd.Series([None] * len(df), index=df.index, dtype=object)
+    df["ticker_instance"] = pd.Series([None] * len(df), index=df.index, dtype=object)
 
     # --- 6) Attach unique tickers directly ---
     df = df.merge(
@@ -133,7 +142,7 @@ def attach_tickers_to_fundamentals(
         right_on="cik_map_unique",
         how="left",
     )
-    df["ticker"] = df["ticker"].fillna(df["ticker_unique"])
+    df["ticker"] = df["ticker"].fillna(df["ticker_unique"].astype("string"))
     df = df.drop(columns=["cik_map_unique", "ticker_unique"])
 
     # --- 7) Attach duplicate ticker lists ---
@@ -149,36 +158,29 @@ def attach_tickers_to_fundamentals(
     )
     df = df.drop(columns=["cik_map_dup", "ticker_duplicates_tmp"])
 
-    # --- 8) Helper: US-ticker heuristic ---
-    def is_us_ticker(ticker: str) -> bool:
-        if not isinstance(ticker, str):
-            return False
-        if "." not in ticker:
-            return True
-        # Allow US share-class style suffixes like .A, .B, .C, .U
-        allowed_suffixes = {".A", ".B", ".C", ".U"}
-        return any(ticker.endswith(s) for s in allowed_suffixes)
+    # --- 8) Helper: US-ticker heuristic (vectorised) ---
+    def is_us_ticker(tickers: pd.Series) -> pd.Series:
+        tickers = tickers.astype("string")
+        # no '.' at all, or a US share-class style suffix like .A, .B, .C, .U
+        us = ~tickers.str.contains(".", regex=False) | tickers.str.endswith((".A", ".B", ".C", ".U"))
+        return us.fillna(False).astype(bool)
 
     # --- 9) Build ticker_instance lists for CIKs still without any mapping ---
-    def _extract_from_instance(val: str):
-        if not isinstance(val, str):
-            return None
-        return val.split("-")[0].upper().strip()
-
     mask_no_map = df["ticker"].isna() & df["ticker_duplicates"].isna()
 
     if instance_col in df.columns:
         inst_df = df.loc[mask_no_map, [cik_col_fund, instance_col]].dropna()
         if len(inst_df) > 0:
+            # 'aapl-20231231.xml' -> 'AAPL' in one .str pass, then a sorted unique list per CIK
+            inst_df["inst_ticker"] = (
+                inst_df[instance_col].astype("string")
+                .str.split("-", n=1).str[0]
+                .str.upper().str.strip()
+            )
             inst_map = (
-                inst_df.groupby(cik_col_fund)[instance_col]
-                .apply(
-                    lambda vals: sorted({
-                        _extract_from_instance(v)
-                        for v in vals
-                        if _extract_from_instance(v) is not None
-                    })
-                )
+                inst_df.dropna(subset=["inst_ticker"])
+                .groupby(cik_col_fund)["inst_ticker"]
+                .agg(lambda s: sorted(set(s)))
                 .reset_index(name="ticker_instance_tmp")
             )
             df = df.merge(inst_map, on=cik_col_fund, how="left")
@@ -200,25 +202,29 @@ def attach_tickers_to_fundamentals(
             grouped = date_tmp.groupby(cik_col_fund)[date_col].agg(["min", "max"])
             cik_date_ranges = grouped.to_dict("index")
 
-    def _has_price_data(ticker: str, cik: int) -> bool:
-        """Check if yfinance has any prices for this ticker in relevant window."""
+    @functools.lru_cache(maxsize=None)
+    def _probe(ticker: str, start_iso: str | None, end_iso: str | None) -> bool:
+        """One yfinance request per distinct (ticker, window); shared across CIKs."""
         try:
-            if cik in cik_date_ranges:
-                dmin = cik_date_ranges[cik]["min"]
-                dmax = cik_date_ranges[cik]["max"]
-                if pd.isna(dmin) or pd.isna(dmax):
-                    hist = yf.Ticker(ticker).history(period=yf_test_period)
-                else:
-                    start = dmin - pd.Timedelta(days=date_window_days)
-                    end = dmax + pd.Timedelta(days=date_window_days)
-                    hist = yf.Ticker(ticker).history(start=start, end=end)
-            else:
+            if start_iso is None:
                 hist = yf.Ticker(ticker).history(period=yf_test_period)
-
+            else:
+                hist = yf.Ticker(ticker).history(start=start_iso, end=end_iso)
             return hist is not None and len(hist) > 0
         except Exception:
             return False
 
+    def _has_price_data(ticker: str, cik: int) -> bool:
+        """Check if yfinance has any prices for this ticker in relevant window."""
+        start_iso = end_iso = None
+        if cik in cik_date_ranges:
+            dmin = cik_date_ranges[cik]["min"]
+            dmax = cik_date_ranges[cik]["max"]
+            if not (pd.isna(dmin) or pd.isna(dmax)):
+                start_iso = (dmin - pd.Timedelta(days=date_window_days)).strftime("%Y-%m-%d")
+                end_iso = (dmax + pd.Timedelta(days=date_window_days)).strftime("%Y-%m-%d")
+        return _probe(ticker, start_iso, end_iso)
+
     # --- 11) For CIKs without a unique ticker but with candidate lists, choose final ticker ---
     ciks_needing_choice = df.loc[
         df["ticker"].isna() & (df["ticker_duplicates"].notna() | df["ticker_instance"].notna()),
@@ -228,74 +234,66 @@ def attach_tickers_to_fundamentals(
     if verbose:
         print(f"CIKs needing candidate selection: {len(ciks_needing_choice)}")
 
-    chosen_tickers: dict[int, str] = {}
-
-    for cik in ciks_needing_choice:
-        sub = df[df[cik_col_fund] == cik]
-
-        candidates = set()
-
-        # From ticker_duplicates
-        dup_lists = [x for x in sub["ticker_duplicates"].dropna().tolist()]
-        for lst in dup_lists:
-            if isinstance(lst, (list, tuple, set)):
-                candidates.update(lst)
-
-        # From ticker_instance
-        inst_lists = [x for x in sub["ticker_instance"].dropna().tolist()]
-        for lst in inst_lists:
-            if isinstance(lst, (list, tuple, set)):
-                candidates.update(lst)
-
-        candidates = [c for c in candidates if c]
-
-        if not candidates:
-            continue
+    # 11.1 Candidate (cik, ticker) pairs from both list columns (no network yet)
+    need = df.loc[df[cik_col_fund].isin(ciks_needing_choice)]
+    cand_df = (
+        pd.concat(
+            [
+                need[[cik_col_fund, col]].explode(col).rename(columns={cik_col_fund: "cik", col: "ticker"})
+                for col in ("ticker_duplicates", "ticker_instance")
+            ],
+            ignore_index=True,
+        )
+        .dropna(subset=["ticker"])
+        .drop_duplicates()
+    )
+    cand_df = cand_df[cand_df["ticker"].astype(str).ne("")].reset_index(drop=True)
+    cand_df["is_us"] = is_us_ticker(cand_df["ticker"])
+
+    # 11.2 Probe yfinance concurrently; each (cik, ticker) pair is requested once
+    has_prices: dict[tuple[int, str], bool] = {}
+
+    def _probe_all(pairs: pd.DataFrame):
+        probes = [p for p in zip(pairs["cik"], pairs["ticker"]) if p not in has_prices]
+        if not probes:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futures = {ex.submit(_has_price_data, t, cik): (cik, t) for cik, t in probes}
+            for fut in as_completed(futures):
+                has_prices[futures[fut]] = fut.result()
+
+    # US-looking candidates first; other candidates only for CIKs where no US ticker has prices
+    _probe_all(cand_df[cand_df["is_us"]])
+    cand_df["has_price"] = [has_prices.get(k, False) for k in zip(cand_df["cik"], cand_df["ticker"])]
+    ciks_with_us_hit = cand_df.loc[cand_df["is_us"] & cand_df["has_price"], "cik"].unique()
+    _probe_all(cand_df[~cand_df["cik"].isin(ciks_with_us_hit)])
+    # pairs never probed (non-US candidates of CIKs that already have a US hit) count as no prices
+    cand_df["has_price"] = [has_prices.get(k, False) for k in zip(cand_df["cik"], cand_df["ticker"])]
+
+    # 11.3 Choose per CIK from the cached probe results, as one sort + groupby-first:
+    #      US ticker with prices > any ticker with prices > 'DELISTED'
+    #      (ties broken alphabetically so the choice is deterministic)
+    chosen_tickers = pd.Series(dtype=object)
+    if not cand_df.empty:
+        best = (
+            cand_df.sort_values(["cik", "has_price", "is_us", "ticker"], ascending=[True, False, False, True])
+            .groupby("cik", sort=False)
+            .first()
+        )
+        chosen_tickers = best["ticker"].where(best["has_price"], "DELISTED")
 
         if verbose:
-            print(f"\nCIK {cik} candidates: {candidates}")
-
-        # 1) filter to US-looking tickers with prices
-        valid_us = []
-        for t in candidates:
-            if is_us_ticker(t) and _has_price_data(t, cik):
-                valid_us.append(t)
-                if verbose:
-                    print(f"  ✅ US ticker {t} has price data")
-
-        if valid_us:
-            chosen = valid_us[0]
-            chosen_tickers[cik] = chosen
-            if verbose:
-                print(f"  -> Chosen ticker for CIK {cik}: {chosen}")
-            continue
-
-        # 2) otherwise: any ticker with prices
-        valid_any = []
-        for t in candidates:
-            if _has_price_data(t, cik):
-                valid_any.append(t)
-                if verbose:
-                    print(f"  ✅ Non-US ticker {t} has price data")
-
-        if valid_any:
-            chosen = valid_any[0]
-            chosen_tickers[cik] = chosen
-            if verbose:
-                print(f"  -> Chosen ticker for CIK {cik}: {chosen}")
-            continue
-
-        # 3) If no candidates have price data: mark as 'DELISTED'
-        chosen_tickers[cik] = "DELISTED"
-        if verbose:
-            print(f"  ⚠️ No price data for any candidate. Marking CIK {cik} as DELISTED.")
+            n_delisted = int((~best["has_price"]).sum())
+            print(f"Chosen tickers for {len(best) - n_delisted} CIKs; {n_delisted} marked DELISTED.")
+            print(chosen_tickers.head(20).to_string())
 
-    # Apply chosen tickers to df
-    for cik, ticker_final in chosen_tickers.items():
-        df.loc[df[cik_col_fund] == cik, "ticker"] = ticker_final
+    # Apply chosen tickers to df (one hash lookup over the rows still missing a ticker)
+    if not chosen_tickers.empty:
+        mask = df["ticker"].isna()
+        df.loc[mask, "ticker"] = df.loc[mask, cik_col_fund].map(chosen_tickers)
 
     # --- 12) Save to parquet and return df ---
-    df.to_parquet(parquet_out, index=False)
+    write_parquet(df, parquet_out)
     if verbose:
         print(f"[INFO] Saved enriched fundamentals with tickers to: {parquet_out}")
 
@@ -0,0 +1,28 @@
+from pathlib import Path
+import pandas as pd
+from .fsds_loader import load_fsds_from_zip
+from .extractor_bs import _build_balance_sheets
+from .extractor_is import _build_income_statements
+from .extractor_cf import _build_cash_flows
+from .extractor_metadata import _build_metadata
+
+def extract_all(zip_path: Path) -> dict[str, pd.DataFrame]:
+    """
+    Run every Bronze extractor on one FSDS ZIP, parsing the ZIP only once.
+
+    Same outputs as calling extract_metadata / extract_balance_sheets /
+    extract_income_statements / extract_cash_flows one by one, but sub/pre/num
+    are loaded a single time and shared (the builders never modify them).
+
+    RETURNS:
+        {'metadata': ..., 'bs': ..., 'is': ..., 'cf': ...}
+    """
+    zip_path = Path(zip_path)
+    dfs = load_fsds_from_zip(zip_path, tables=("sub", "pre", "num"))
+
+    return {
+        "metadata": _build_metadata(dfs["sub"]),
+        "bs": _build_balance_sheets(dfs, zip_path),
+        "is": _build_income_statements(dfs, zip_path),
+        "cf": _build_cash_flows(dfs, zip_path),
+    }
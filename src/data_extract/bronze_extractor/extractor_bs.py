@@ -2,7 +2,7 @@
 
 from pathlib import Path
 import pandas as pd
-from .fsds_loader import load_fsds_from_zip
+from .fsds_loader import load_fsds_from_zip, stmt_mask, shared_category
 
 def extract_balance_sheets(zip_path: Path) -> pd.DataFrame:
     """
@@ -27,12 +27,33 @@ def extract_balance_sheets(zip_path: Path) -> pd.DataFrame:
     """
 
     # 1) Load raw FSDS tables from the ZIP
-    dfs = load_fsds_from_zip(zip_path)
+    dfs = load_fsds_from_zip(zip_path, tables=("sub", "pre", "num"))
+    return _build_balance_sheets(dfs, zip_path)
+
+
+def _build_balance_sheets(dfs: dict, zip_path: Path) -> pd.DataFrame:
+    """extract_balance_sheets on already-loaded FSDS tables (see extractor_all.extract_all)."""
     sub, pre, num = dfs["sub"], dfs["pre"], dfs["num"]
 
-    # 2) Find all (adsh, tag) pairs that belong to the Balance Sheet (stmt == 'BS')
+    # Join keys as categoricals with shared categories across tables,
+    # so the merges below hash int codes instead of Python strings
+    # (local re-typed frames: `dfs` may be shared with other extractors)
+    adsh_t = shared_category(sub["adsh"], pre["adsh"], num["adsh"])
+    tag_t = shared_category(pre["tag"], num["tag"])
+    sub = sub.astype({"adsh": adsh_t}, copy=False)
+    pre = pre.astype({"adsh": adsh_t, "tag": tag_t}, copy=False)
+    num = num.astype({"adsh": adsh_t, "tag": tag_t}, copy=False)
+
+    # 2) Keep only annual and quarterly report forms (adjust as you like)
+    #    Done first so every later join only sees facts of these filings.
+    valid_forms = {"10-K", "10-K/A", "10-Q", "10-Q/A"}
+    sub_filtered = sub[sub["form"].isin(valid_forms)]
+    keep_adsh = sub_filtered["adsh"].unique()
+
+    # 3) Find all (adsh, tag) pairs that belong to the Balance Sheet (stmt == 'BS')
     #    We uppercase to be safe against minor casing differences.
-    bs_tags = pre.loc[pre["stmt"].astype(str).str.upper() == "BS", ["adsh","tag"]].drop_duplicates()
+    bs_mask = stmt_mask(pre["stmt"], lambda labels: labels == "BS") & pre["adsh"].isin(keep_adsh)
+    bs_tags = pre.loc[bs_mask, ["adsh","tag"]].drop_duplicates()
 
     # Edge case: if no BS tags found, return empty quickly
     if bs_tags.empty:
@@ -42,26 +63,24 @@ def extract_balance_sheets(zip_path: Path) -> pd.DataFrame:
             "fye","accepted","countryba","stprba","source_zip",
         ])
 
-
-    # 3) Keep only numeric facts for those BS (adsh, tag) pairs
+    # 4) Keep only numeric facts for those BS (adsh, tag) pairs
     #    Inner join drops anything not in the BS presentation for that filing.
-    num_bs = num.merge(bs_tags, on=["adsh", "tag"], how="inner")
-
-    # 4) Keep only annual and quarterly report forms (adjust as you like)
-    valid_forms = {"10-K", "10-K/A", "10-Q", "10-Q/A"}
-    sub_filtered = sub[sub["form"].isin(valid_forms)].copy()
+    num_bs = num[num["adsh"].isin(keep_adsh)].merge(bs_tags, on=["adsh", "tag"], how="inner")
 
     # 5) Attach filing/company metadata to each numeric fact row
+    #    (inner: every remaining adsh is in sub_filtered by construction)
     meta_cols = ["adsh","cik","name","form","fy","fp","period","filed","sic","instance",
     "fye","accepted","countryba","stprba"]
     meta_cols = [c for c in meta_cols if c in sub_filtered.columns]
-    bs_full = num_bs.merge(sub_filtered[meta_cols], on="adsh", how="left")
+    bs_full = num_bs.merge(sub_filtered[meta_cols], on="adsh", how="inner")
 
 
-    # 6) Clean numeric values; drop non-numeric or empty values
-    bs_full["value"] = pd.to_numeric(bs_full["value"], errors="coerce")
+    # 6) Drop rows with missing values (value is parsed as float64 by the loader)
     bs_full = bs_full.dropna(subset=["value"]).reset_index(drop=True)
 
+    # Back to plain strings for downstream consumers
+    bs_full[["adsh", "tag"]] = bs_full[["adsh", "tag"]].astype(object)
+
     # 7) Add lineage (which zip produced this row)
     bs_full["source_zip"] = zip_path.name
 
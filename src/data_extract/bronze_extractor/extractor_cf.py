@@ -1,8 +1,11 @@
 from pathlib import Path
 import pandas as pd
-from .fsds_loader import load_fsds_from_zip
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from .fsds_loader import load_fsds_from_zip, cached_table_path, shared_category, stmt_mask
 
-def extract_cash_flows(zip_path: Path) -> pd.DataFrame:
+def extract_cash_flows(zip_path: Path, denormalize: bool = True):
     """
     Extract Cash Flow (CF) facts for all annual filings in a given FSDS ZIP.
     Bronze-layer output (LONG format, raw-ish): we do not filter by qtrs/ddate here.
@@ -23,45 +26,110 @@ def extract_cash_flows(zip_path: Path) -> pd.DataFrame:
         - value: numeric value (float)
         - cik, name, form, fy, fp, period, filed, sic: filing metadata
         - source_zip: the ZIP filename (lineage)
+
+    With denormalize=False, returns (cf_facts, filings_meta) instead:
+        - cf_facts: the num columns + source_zip only (no per-row metadata copies)
+        - filings_meta: adsh + filing metadata, one row per filing in cf_facts
+      Join them on adsh downstream when the metadata is actually needed.
     """
 
-    # 1) Load raw FSDS tables from the ZIP
-    dfs = load_fsds_from_zip(zip_path)
-    sub, pre, num = dfs["sub"], dfs["pre"], dfs["num"]
+    # 1) Load raw FSDS tables from the ZIP (pre is scanned from its Parquet cache in step 3)
+    dfs = load_fsds_from_zip(zip_path, tables=("sub", "num"))
+    return _build_cash_flows(dfs, zip_path, denormalize=denormalize)
+
+
+def _build_cash_flows(dfs: dict, zip_path: Path, denormalize: bool = True):
+    """
+    extract_cash_flows on already-loaded FSDS tables (see extractor_all.extract_all).
+    If `dfs` already holds 'pre', CF tags come from it; otherwise from a scan of pre's cache file.
+    """
+    sub, num = dfs["sub"], dfs["num"]
+
+    # 2) Restrict to annual and quarterly report forms (adjust to {"10-K"} if you want only US domestic)
+    #    Done first so pre/num are cut down to these filings before any join.
+    valid_forms = {"10-K", "10-K/A", "10-Q", "10-Q/A"}
+    sub_filtered = sub[sub["form"].isin(valid_forms)]
+    accepted_adsh = sub_filtered["adsh"].unique()
 
-    # 2) Identify Cash Flow tags from the presentation table
+    # 3) Identify Cash Flow tags from the presentation table
     #    Most commonly 'CF'. Some quarters use 'SCF' or variants.
     #    We'll accept stmt that equals 'CF' OR contains 'CF' to be robust.
-    stmt_series = pre["stmt"].astype(str).str.upper()
-    cf_mask = (stmt_series == "CF") | stmt_series.str.contains("CF", na=False)
-    cf_tags = pre.loc[cf_mask, ["adsh", "tag"]].drop_duplicates()
+    #    pre is scanned from the loader's Parquet cache (fingerprinted on the ZIP),
+    #    so the filter and the [adsh, tag] projection run inside the Arrow scan.
+    if "pre" in dfs:
+        pre = dfs["pre"]
+        cf_mask = stmt_mask(pre["stmt"], lambda labels: labels.str.contains("CF", na=False))
+        cf_mask &= pre["adsh"].isin(accepted_adsh)
+        cf_tags = pre.loc[cf_mask, ["adsh", "tag"]].drop_duplicates()
+    else:
+        pre_ds = ds.dataset(cached_table_path(zip_path, "pre"), format="parquet")
+        stmt = ds.field("stmt").cast(pa.string())  # dictionary-typed in the cache
+        cf_tags = pre_ds.to_table(
+            columns=["adsh", "tag"],
+            filter=pc.match_substring(stmt, "CF", ignore_case=True)
+            & ds.field("adsh").isin(accepted_adsh.tolist()),
+        ).to_pandas().drop_duplicates()
 
     # Edge case: nothing found -> return an empty, well-formed DataFrame
     if cf_tags.empty:
-        return pd.DataFrame(columns=[
-            "adsh","tag","version","ddate","qtrs","uom","coreg","value",
-            "cik","name","form","fy","fp","period","filed","sic","instance",
-            "fye","accepted","countryba","stprba","source_zip",
-        ])
+        fact_cols = ["adsh","tag","version","ddate","qtrs","uom","coreg","value"]
+        meta_cols = ["adsh","cik","name","form","fy","fp","period","filed","sic","instance",
+        "fye","accepted","countryba","stprba"]
+        if not denormalize:
+            return pd.DataFrame(columns=fact_cols + ["source_zip"]), pd.DataFrame(columns=meta_cols)
+        return pd.DataFrame(columns=fact_cols + meta_cols[1:] + ["source_zip"])
 
 
-    # 3) Keep only numeric facts for those (adsh, tag) pairs on the Cash Flow statement
-    num_cf = num.merge(cf_tags, on=["adsh", "tag"], how="inner")
+    # 4) Keep only numeric facts for those (adsh, tag) pairs on the Cash Flow statement
+    #    num (the largest table) is first cut to the accepted filings.
+    #    Index join: cf_tags is unique on (adsh, tag), so its index is a lookup table
+    #    and no merge key columns are hashed and copied on both sides.
+    #    Join keys become categoricals with one shared category set per key, so both
+    #    joins below compare int codes (differing categories would fall back to object).
+    keys = ["adsh", "tag"]
+    num = num[num["adsh"].isin(accepted_adsh)]
+    key_types = {
+        "adsh": shared_category(num["adsh"], cf_tags["adsh"], sub_filtered["adsh"]),
+        "tag": shared_category(num["tag"], cf_tags["tag"]),
+    }
+    num = num.astype(key_types, copy=False)
+    cf_tags = cf_tags.astype(key_types, copy=False)
+    sub_filtered = sub_filtered.astype({"adsh": key_types["adsh"]}, copy=False)
 
-    # 4) Restrict to annual and quarterly report forms (adjust to {"10-K"} if you want only US domestic)
-    valid_forms = {"10-K", "10-K/A", "10-Q", "10-Q/A"}
-    sub_filtered = sub[sub["form"].isin(valid_forms)].copy()
+    num_cf = (
+        num.set_index(keys)
+        .join(cf_tags.set_index(keys), how="inner")
+        .reset_index()
+    )
 
     # 5) Attach filing/company metadata to each numeric CF row
+    #    sub is unique on adsh, so join against its index (meta columns only);
+    #    inner: every remaining adsh is in sub_filtered by construction
     meta_cols = ["adsh","cik","name","form","fy","fp","period","filed","sic","instance",
     "fye","accepted","countryba","stprba"]
     meta_cols = [c for c in meta_cols if c in sub_filtered.columns]
-    cf_full = num_cf.merge(sub_filtered[meta_cols], on="adsh", how="left")
+    sub_meta = sub_filtered.set_index("adsh")[[c for c in meta_cols if c != "adsh"]]
+
+    if not denormalize:
+        # Facts and filings kept apart: no metadata copied onto every fact row
+        cf_facts = num_cf.dropna(subset=["value"]).reset_index(drop=True)
+        cf_facts[keys] = cf_facts[keys].astype(object)
+        cf_facts["source_zip"] = zip_path.name
+
+        filings_meta = sub_meta[sub_meta.index.isin(cf_facts["adsh"].unique())].reset_index()
+        filings_meta["adsh"] = filings_meta["adsh"].astype(object)
 
-    # 6) Numeric coercion; drop rows with non-numeric or missing values
-    cf_full["value"] = pd.to_numeric(cf_full["value"], errors="coerce")
+        print(f"Extracted {len(cf_facts):,} CF facts from {zip_path.name} | filings={len(filings_meta):,}")
+        return cf_facts, filings_meta
+
+    cf_full = num_cf.join(sub_meta, on="adsh", how="inner")
+
+    # 6) Drop rows with missing values (value is parsed as float64 by the loader)
     cf_full = cf_full.dropna(subset=["value"]).reset_index(drop=True)
 
+    # Back to plain strings for downstream consumers
+    cf_full[keys] = cf_full[keys].astype(object)
+
     # 7) Add lineage (which ZIP produced this)
     cf_full["source_zip"] = zip_path.name
 
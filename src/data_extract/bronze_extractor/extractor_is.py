@@ -1,6 +1,6 @@
 from pathlib import Path
 import pandas as pd
-from .fsds_loader import load_fsds_from_zip
+from .fsds_loader import load_fsds_from_zip, stmt_mask
 
 def extract_income_statements(zip_path: Path) -> pd.DataFrame:
     """
@@ -32,14 +32,19 @@ def extract_income_statements(zip_path: Path) -> pd.DataFrame:
     """
 
     # 1) Load raw FSDS tables from the ZIP
-    dfs = load_fsds_from_zip(zip_path)
+    dfs = load_fsds_from_zip(zip_path, tables=("sub", "pre", "num"))
+    return _build_income_statements(dfs, zip_path)
+
+
+def _build_income_statements(dfs: dict, zip_path: Path) -> pd.DataFrame:
+    """extract_income_statements on already-loaded FSDS tables (see extractor_all.extract_all)."""
     sub, pre, num = dfs["sub"], dfs["pre"], dfs["num"]
 
     # 2) Identify Income Statement tags from the presentation table
     #    Most quarters use stmt == 'IS' for income statement.
     #    (If later see variants like 'CI' or 'INC', you can broaden this filter.)
-    stmt_series = pre["stmt"].astype(str).str.upper()
-    is_tags = pre.loc[stmt_series == "IS", ["adsh", "tag"]].drop_duplicates()
+    is_mask = stmt_mask(pre["stmt"], lambda labels: labels == "IS")
+    is_tags = pre.loc[is_mask, ["adsh", "tag"]].drop_duplicates()
 
 
     # Edge case: if nothing found, return an empty, well-formed DataFrame
@@ -65,8 +70,7 @@ def extract_income_statements(zip_path: Path) -> pd.DataFrame:
     meta_cols = [c for c in meta_cols if c in sub_filtered.columns]
     is_full = num_is.merge(sub_filtered[meta_cols], on="adsh", how="left")
 
-    # 6) Numeric coercion; drop rows with non-numeric or missing values
-    is_full["value"] = pd.to_numeric(is_full["value"], errors="coerce")
+    # 6) Drop rows with missing values (value is parsed as float64 by the loader)
     is_full = is_full.dropna(subset=["value"]).reset_index(drop=True)
 
     # 7) Add lineage (which ZIP produced this)
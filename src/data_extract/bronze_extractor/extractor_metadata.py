@@ -21,9 +21,28 @@ def extract_metadata(
         out_path: if provided, write the result as a Parquet file.
     """
 
-    dfs = load_fsds_from_zip(zip_path)
-    sub = dfs["sub"].copy()
+    # Only sub is needed: skip parsing pre/num/tag. No copy either, the
+    # frame is ours and only the masked slice below is materialised.
+    sub = load_fsds_from_zip(zip_path, tables=("sub",))["sub"]
+    idx = _build_metadata(sub, forms=forms, fp=fp)
 
+    if out_path is not None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        idx.to_parquet(
+            out_path, index=False, engine="pyarrow",
+            compression="zstd", compression_level=3,
+            row_group_size=128_000, use_dictionary=True,
+        )
+
+    return idx
+
+
+def _build_metadata(
+    sub: pd.DataFrame,
+    forms=("10-K", "10-K/A", "10-Q", "10-Q/A"),
+    fp=None,
+) -> pd.DataFrame:
+    """extract_metadata on an already-loaded sub table (see extractor_all.extract_all)."""
     # Normalise company name column across quarters
     if "name" not in sub.columns and "conm" in sub.columns:
         sub = sub.rename(columns={"conm": "name"})
@@ -55,8 +74,4 @@ def extract_metadata(
         ascending=[False, True, True],
     ).reset_index(drop=True)
 
-    if out_path is not None:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        idx.to_parquet(out_path, index=False)
-
     return idx
@@ -4,9 +4,32 @@ from typing import Union
 import pandas as pd
 from pathlib import Path
 from typing import Optional
+import time
 import yfinance as yf
+from curl_cffi import requests as curl_requests
 
 
+YF_BATCH_SIZE = 100  # tickers per yf.download call
+YF_RETRIES = 5       # attempts per yf.download call (exponential backoff between them)
+
+# One HTTP session for every yfinance call in this module: TCP/TLS connections
+# (and Yahoo's cookie/crumb) are reused across tickers and batches.
+# yfinance >= 0.2.60 only accepts curl_cffi sessions.
+SESSION = curl_requests.Session(impersonate="chrome")
+
+
+def _download(tickers, backoff: float = 0.5, **kwargs) -> pd.DataFrame:
+    """yf.download on the shared SESSION, retried on errors (429 / 5xx / timeouts)."""
+    for attempt in range(YF_RETRIES):
+        try:
+            return yf.download(tickers, session=SESSION, progress=False, **kwargs)
+        except Exception as e:
+            if attempt == YF_RETRIES - 1:
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"[WARN] yf.download failed ({e}); retrying in {wait:.1f}s")
+            time.sleep(wait)
+
 
 def _ensure_datetime_and_sort(
     df: pd.DataFrame,
@@ -15,13 +38,13 @@ def _ensure_datetime_and_sort(
 ) -> pd.DataFrame:
     """
     Internal helper:
-    - converts period column to datetime
-    - sorts by ticker, period
-    - returns a copy
+    - sorts by ticker, period (stable; YYYYMMDD / ISO strings sort chronologically)
+    - converts period column to datetime (skipped if it already is)
+    - returns a new frame (the sort result; no extra deep copy)
     """
-    df = df.copy()
-    df[period_col] = pd.to_datetime(df[period_col])
-    df = df.sort_values([ticker_col, period_col])
+    df = df.sort_values([ticker_col, period_col], kind="stable", ignore_index=True)
+    if not pd.api.types.is_datetime64_any_dtype(df[period_col]):
+        df[period_col] = pd.to_datetime(df[period_col], cache=True)
     return df
 
 def make_ticker_period_ranges(
@@ -39,7 +62,7 @@ def make_ticker_period_ranges(
     - start_period = earliest period per ticker
     - end_period   = latest  period per ticker
     """
-    df = _ensure_datetime_and_sort(df_funda, ticker_col, period_col)
+    df = _ensure_datetime_and_sort(df_funda[[ticker_col, period_col]], ticker_col, period_col)
 
     ranges = (
         df.groupby(ticker_col)[period_col]
@@ -65,12 +88,11 @@ def fetch_daily_prices_for_ticker(
     or an empty DataFrame if no data is found.
     """
     # yfinance's 'end' is exclusive, so add one day
-    df = yf.download(
+    df = _download(
         ticker,
         start=start,
         end=end + pd.Timedelta(days=1),
         auto_adjust=auto_adjust,
-        progress=False,
     )
 
     if df.empty:
@@ -139,24 +161,42 @@ def download_daily_prices_for_ranges(
     df[start_col] = pd.to_datetime(df[start_col])
     df[end_col] = pd.to_datetime(df[end_col])
 
-    for _, row in df.iterrows():
-        ticker = row[ticker_col]
-        start = row[start_col]
-        end = row[end_col]
-
-        daily = fetch_daily_prices_for_ticker(
-            ticker=ticker,
-            start=start,
-            end=end,
+    # Batched download: one threaded yf.download per YF_BATCH_SIZE tickers over the
+    # batch's overall range, then each ticker is sliced back to its own [start, end]
+    for i in range(0, len(df), YF_BATCH_SIZE):
+        batch = df.iloc[i:i + YF_BATCH_SIZE]
+        tickers = batch[ticker_col].tolist()
+
+        raw = _download(
+            tickers,
+            start=batch[start_col].min(),
+            end=batch[end_col].max() + pd.Timedelta(days=1),  # yfinance's 'end' is exclusive
+            group_by="ticker",
+            threads=True,
             auto_adjust=auto_adjust,
         )
-
-        if daily.empty:
-            # Optional: you can log this if you want
-            # print(f"No price data for {ticker} between {start} and {end}")
+        if raw is None or raw.empty:
             continue
 
-        price_frames.append(daily)
+        for ticker, start, end in zip(tickers, batch[start_col], batch[end_col]):
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                daily = raw[ticker]
+            else:
+                daily = raw
+
+            daily = daily.sort_index().loc[start:end].dropna(how="all")
+            if daily.empty:
+                # Optional: you can log this if you want
+                # print(f"No price data for {ticker} between {start} and {end}")
+                continue
+
+            daily = daily.copy()
+            daily.columns.name = None
+            daily["ticker"] = ticker
+            daily["date"] = daily.index
+            price_frames.append(daily.reset_index(drop=True))
 
     if not price_frames:
         # No data at all
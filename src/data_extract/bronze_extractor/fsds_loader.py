@@ -1,14 +1,155 @@
 from pathlib import Path
-import zipfile
+import codecs
 import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Define our target columns (these rarely change)
+SUB_COLS = ["adsh", "cik", "name", "form", "fy", "fp", "period", "filed", "sic",
+"instance", "fye", "accepted", "countryba", "stprba"]
+PRE_COLS = ["adsh", "tag", "stmt", "report", "line", "version"]
+NUM_COLS = ["adsh", "tag", "ddate", "qtrs", "uom", "value", "coreg", "dimh", "iprx", "version"]
+TAG_COLS = ["tag", "tlabel", "version", "abstract"]
+
+# Narrowed types, parsed directly by Arrow:
+# - num.value as float64 (no string column + pd.to_numeric pass)
+# - pre.stmt as categorical (a handful of codes over millions of rows)
+# Join keys, dates and qtrs stay strings: downstream compares them as strings.
+PRE_TYPES = {"stmt": pa.dictionary(pa.int32(), pa.string())}
+NUM_TYPES = {"value": pa.float64()}
+
+# v2: columns in the file's header order
+_CACHE_VERSION = 2
+
+_TABLES = {
+    "sub": (SUB_COLS, None),
+    "pre": (PRE_COLS, PRE_TYPES),
+    "num": (NUM_COLS, NUM_TYPES),
+    "tag": (TAG_COLS, None),
+}
+
+
+def _find_members(z: zipfile.ZipFile, keys) -> dict:
+    """Map each table key ('sub', 'pre', ...) to its member name inside the open ZIP."""
+    # One pass over the central directory listing.
+    # SEC files look like "2025q2/sub.txt", "2025q2/num.txt", etc.
+    wanted = {f"{key}.txt": key for key in keys}
+    need = {}
+    for n in z.namelist():
+        key = wanted.get(n.lower().rsplit("/", 1)[-1])
+        if key is not None and key not in need:
+            need[key] = n
+    for key in keys:
+        if key not in need:
+            raise FileNotFoundError(f"{key}.txt not found in {Path(z.filename).name}")
+    return need
+
+
+class _Utf8IgnoreStream(io.RawIOBase):
+    """Byte stream over `raw` with invalid UTF-8 dropped, like bytes.decode(errors="ignore")."""
+
+    def __init__(self, raw, chunk_size: int = 16 << 20):
+        self._raw = raw
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._chunk_size = chunk_size
+        self._buf = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            data = self._raw.read(self._chunk_size)
+            text = self._decoder.decode(data, final=not data)
+            if not data and not text:
+                return 0
+            self._buf = memoryview(text.encode("utf-8"))
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def _parse_member(f, wanted_cols=None, column_types=None) -> pa.Table:
+    """Header line off the stream, then pyarrow's multi-threaded CSV reader on the rest."""
+    column_types = column_types or {}
+    actual_cols = f.readline().decode("utf-8", errors="ignore").rstrip("\r\n").split("\t")
+
+    # Pick only the wanted columns that actually exist, in the file's column order
+    # (include_columns returns columns in list order; pandas usecols kept file order)
+    wanted = set(wanted_cols or [])
+    usecols = [c for c in actual_cols if c in wanted] or actual_cols
+
+    return pacsv.read_csv(
+        f,
+        read_options=pacsv.ReadOptions(column_names=actual_cols, block_size=64 << 20),
+        parse_options=pacsv.ParseOptions(delimiter="\t"),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=usecols,
+            # strings by default (safer for mixed data), narrowed where known
+            column_types={c: column_types.get(c, pa.string()) for c in usecols},
+            null_values=["\\N", ""],  # SEC's null marker
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def _read_member(z: zipfile.ZipFile, member_name: str, wanted_cols=None, column_types=None) -> pa.Table:
+    """
+    Read one table from inside an open ZIP as an Arrow table, handling missing columns safely.
+    `column_types` overrides the default string type per column.
+
+    Arrow rejects invalid UTF-8 (e.g. a Latin-1 byte in a company name); such a
+    member is re-read through a stream that drops the invalid bytes, as the
+    original errors="ignore" text reader did.
+    """
+    try:
+        with z.open(member_name) as f:
+            return _parse_member(f, wanted_cols, column_types)
+    except pa.ArrowInvalid as e:
+        if "UTF8" not in str(e):
+            raise
+    with z.open(member_name) as raw:
+        return _parse_member(io.BufferedReader(_Utf8IgnoreStream(raw)), wanted_cols, column_types)
+
+
+def _cache_paths(zip_path: Path, tables) -> dict:
+    """
+    Parquet cache location per table, keyed on the ZIP's size + mtime: a re-downloaded
+    ZIP gets a new key, stale files are simply never read again (safe to delete the dir).
+    Bump _CACHE_VERSION when the cached table layout changes.
+    """
+    st = zip_path.stat()
+    key = f"{zip_path.stem}_{st.st_size}_{st.st_mtime_ns}_v{_CACHE_VERSION}"
+    cache_dir = zip_path.parent / ".fsds_cache"
+    return {t: cache_dir / f"{key}_{t}.parquet" for t in tables}
+
+
+def _write_cache(table: pa.Table, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write-then-rename, so parallel workers never read a half-written file
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(table, str(tmp), compression="zstd", compression_level=1)
+    os.replace(tmp, path)
+
 
-def load_fsds_from_zip(zip_path: Path):
+def load_fsds_from_zip(zip_path: Path, tables=("sub", "pre", "num", "tag"), cache: bool = True):
     """
     Load the four core tables (sub, pre, num, tag) from a single SEC FSDS ZIP file.
 
     Args:
         zip_path (Path): Path to the SEC FSDS ZIP file (e.g., 'data/2025q2.zip').
+        tables (tuple): Subset of tables to read; skipping 'pre'/'num' saves the bulk of the I/O.
+        cache (bool): Reuse / write parsed tables under '<zip dir>/.fsds_cache' as Parquet,
+            so later runs skip the tab-delimited parse entirely.
 
     Returns:
         dict[str, pd.DataFrame]: Dictionary with DataFrames for:
@@ -17,59 +158,91 @@ def load_fsds_from_zip(zip_path: Path):
             - num: Numeric facts (actual financial data)
             - tag: Tag metadata (names, labels, abstracts)
     """
+    zip_path = Path(zip_path)
+    cached = _cache_paths(zip_path, tables) if cache else {}
 
-    # Find paths to the four .txt files inside the ZIP
-    with zipfile.ZipFile(zip_path, "r") as z:
-        names = z.namelist()
-        need = {}
-        for key in ("sub", "pre", "num", "tag"):
-            try:
-                # SEC files look like "2025q2/sub.txt", "2025q2/num.txt", etc.
-                # need[key] = next(n for n in names if n.lower() == (f"{key}.txt"))
-                need[key] = next(
-                    n for n in names
-                    if n.lower().endswith(f"/{key}.txt") or n.lower() == f"{key}.txt"
-                )
-            except StopIteration:
-                raise FileNotFoundError(f"{key}.txt not found in {zip_path.name}")
-
-    # Helper to safely read any member file into a DataFrame
-    def _read_member(member_name: str, wanted_cols=None):
-        """Read one table from inside the ZIP, handling missing columns safely."""
-        # Read only the header first to detect what columns exist
+    tables_out = {}
+    for key in tables:
+        if key in cached and cached[key].exists():
+            tables_out[key] = pq.read_table(cached[key])
+
+    missing = [k for k in tables if k not in tables_out]
+    if missing:
         with zipfile.ZipFile(zip_path, "r") as z:
-            with z.open(member_name) as f:
-                hdr = io.TextIOWrapper(f, encoding="utf-8", errors="ignore")
-                header_df = pd.read_csv(hdr, sep="\t", nrows=0, dtype=str)
-                actual_cols = list(header_df.columns)
+            need = _find_members(z, missing)
 
-        # Pick only the wanted columns that actually exist
-        usecols = [c for c in (wanted_cols or []) if c in actual_cols] or None
+        # Parse the tables concurrently: inflate + Arrow CSV parse release the GIL.
+        # ZipFile handles are not thread-safe, so each thread opens its own.
+        def _read_one(key):
+            cols, types = _TABLES[key]
+            with zipfile.ZipFile(zip_path, "r") as z:
+                return _read_member(z, need[key], cols, types)
+
+        with ThreadPoolExecutor(max_workers=len(missing)) as ex:
+            futs = {key: ex.submit(_read_one, key) for key in missing}
+            for key, fut in futs.items():
+                tables_out[key] = fut.result()
+
+        for key in missing:
+            if key in cached:
+                _write_cache(tables_out[key], cached[key])
 
-        # Reopen and load the full data file using those columns
-        with zipfile.ZipFile(zip_path, "r") as z:
-            with z.open(member_name) as f:
-                text_stream = io.TextIOWrapper(f, encoding="utf-8", errors="ignore")
-                return pd.read_csv(
-                    text_stream,
-                    sep="\t",
-                    na_values="\\N",  # SEC's null marker
-                    dtype=str,        # safer for mixed data
-                    low_memory=False,
-                    usecols=usecols
-                )
-
-    # Define our target columns (these rarely change)
-    sub_cols = ["adsh", "cik", "name", "form", "fy", "fp", "period", "filed", "sic",
-    "instance", "fye", "accepted", "countryba", "stprba"]
-    pre_cols = ["adsh", "tag", "stmt", "report", "line", "version"]
-    num_cols = ["adsh", "tag", "ddate", "qtrs", "uom", "value", "coreg", "dimh", "iprx", "version"]
-    tag_cols = ["tag", "tlabel", "version", "abstract"]
-
-    # Read all four tables and return them
     return {
-        "sub": _read_member(need["sub"], sub_cols),
-        "pre": _read_member(need["pre"], pre_cols),
-        "num": _read_member(need["num"], num_cols),
-        "tag": _read_member(need["tag"], tag_cols),
+        key: tables_out.pop(key).to_pandas(self_destruct=True, split_blocks=True)
+        for key in tables
     }
+
+
+def cached_table_path(zip_path: Path, key: str) -> Path:
+    """
+    Path of one table's '.fsds_cache' Parquet file (the one load_fsds_from_zip uses),
+    parsing the ZIP member and writing it first if needed. Lets callers scan a table
+    with pyarrow.dataset filters instead of loading it whole.
+    """
+    zip_path = Path(zip_path)
+    path = _cache_paths(zip_path, (key,))[key]
+    if not path.exists():
+        cols, types = _TABLES[key]
+        with zipfile.ZipFile(zip_path, "r") as z:
+            table = _read_member(z, _find_members(z, (key,))[key], cols, types)
+        _write_cache(table, path)
+    return path
+
+
+def stmt_mask(stmt: pd.Series, accept) -> pd.Series:
+    """
+    Boolean mask of rows whose statement code is accepted.
+
+    `accept(labels)` gets the upper-cased unique labels (a pd.Index of a few dozen
+    values) and returns a boolean array; the row-level test is then a single
+    isin over the categorical codes instead of per-row string passes.
+    Plain string columns are dictionary-encoded and tested with Arrow compute
+    kernels (utf8_upper on the labels, is_in on the int indices).
+    """
+    if isinstance(stmt.dtype, pd.CategoricalDtype):
+        cats = stmt.cat.categories
+        accepted = cats[accept(cats.astype(str).str.upper())]
+        return stmt.isin(accepted)
+
+    arr = pa.array(stmt, from_pandas=True).dictionary_encode()
+    labels = pd.Index(pc.utf8_upper(arr.dictionary).to_pandas())
+    accepted = pa.array(np.flatnonzero(accept(labels)), type=arr.indices.type)
+    mask = pc.is_in(arr.indices, value_set=accepted)  # null stmt -> False
+    return pd.Series(mask.to_numpy(zero_copy_only=False), index=stmt.index)
+
+
+def map_categorical(col: pd.Series, mapping: dict, fill_value=np.nan, dtype=object) -> np.ndarray:
+    """
+    col.map(mapping) as an array: each distinct value is looked up once, then
+    gathered by category code. Unmapped and missing values get `fill_value`.
+    """
+    col = col.astype("category")
+    by_code = col.cat.categories.map(mapping).to_numpy(dtype=dtype, na_value=fill_value)
+    by_code = np.append(by_code, np.array([fill_value], dtype=dtype))  # code -1 -> fill_value
+    return by_code[col.cat.codes.to_numpy()]
+
+
+def shared_category(*cols: pd.Series) -> pd.CategoricalDtype:
+    """One CategoricalDtype covering the values of all `cols` (needed for categorical merges)."""
+    union = union_categoricals([c.astype("category") for c in cols], ignore_order=True)
+    return pd.CategoricalDtype(union.categories)
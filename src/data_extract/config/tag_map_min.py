@@ -322,5 +322,27 @@ UOM_MULTIPLIERS = {
     "USDth": 1e3,
     "USDthousands": 1e3,
 }
-MONETARY_UOMS = set(UOM_MULTIPLIERS.keys())
-SHARE_UOMS = {"shares"}  # filter by this set in shares pass
\ No newline at end of file
+MONETARY_UOMS = frozenset(UOM_MULTIPLIERS.keys())
+SHARE_UOMS = frozenset({"shares"})  # filter by this set in shares pass
+
+
+# ---------- Reverse maps (built once at import) ---------- #
+# raw XBRL tag -> canonical name, per section (the canonical name maps to itself).
+# Same semantics as the transformers' _reverse_map: on a synonym shared by two
+# canonicals, the later one wins.
+_SECTIONS = (("BS", BS), ("IS", IS), ("CF", CF), ("SHARES", SHARES))
+
+TAG_TO_CANON_BY_SECTION = {
+    sec: {tag: canon for canon, syns in fwd.items() for tag in (canon, *(syns or []))}
+    for sec, fwd in _SECTIONS
+}
+
+
+def tag_pref_rank(forward: dict[str, list[str]]) -> dict[str, int]:
+    """tag -> position of tag in its canonical's [canon, *synonyms] (lower = preferred)."""
+    return {tag: i for canon, syns in forward.items() for i, tag in enumerate((canon, *(syns or [])))}
+
+
+# Collision tie-break rank per section. Keyed by tag alone: a tag's canonical is
+# fixed by TAG_TO_CANON_BY_SECTION (same later-wins rule), so (canon, tag) == tag.
+PREF_RANK_BY_SECTION = {sec: tag_pref_rank(fwd) for sec, fwd in _SECTIONS}
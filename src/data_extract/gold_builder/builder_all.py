@@ -1,7 +1,40 @@
 from __future__ import annotations
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from .builder_per_zip import _qc_flags  # no need for _latest_per_cik_fy now
+from .builder_per_zip import GOLD_DATASET_DIR, GOLD_PARTITIONING
+
+def load_gold(
+    gold_dir: Path,              # e.g., Path("data/gold")
+    filters=None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Read the quarter-partitioned gold dataset written by build_gold_zip,
+    pushing column selection and row filters down into the Parquet scan.
+
+    filters: a pyarrow.dataset expression, e.g. ds.field("source_zip") == "2025q2",
+             or pyarrow-style DNF tuples, e.g. [("fy", ">=", "2020")]
+    """
+    root = Path(gold_dir) / GOLD_DATASET_DIR
+    files = sorted(root.glob("source_zip=*/*.parquet"))
+    if not files:
+        return pd.DataFrame()
+
+    # Quarters carry different canonical columns: scan with the union of their schemas
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    schema = schema.append(GOLD_PARTITIONING.schema.field("source_zip"))
+    dataset = ds.dataset(
+        [str(f) for f in files], schema=schema, format="parquet",
+        partitioning=GOLD_PARTITIONING, partition_base_dir=str(root),
+    )
+
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+    return dataset.to_table(columns=columns, filter=filters).to_pandas(self_destruct=True, split_blocks=True)
 
 def build_gold_all(
     gold_zip_dir: Path,          # e.g., Path("data/gold")
@@ -13,14 +46,19 @@ def build_gold_all(
     This version keeps **all filings (annual + quarterly)** — i.e. one row per adsh.
     No dedup by (cik, fy);  can later filter/deduplicate in analysis.
     """
-    files = sorted(gold_zip_dir.glob("*_financials.parquet"))
-    dfs = [pd.read_parquet(f) for f in files if f.exists()]
-    if not dfs:
+    files = [f for f in sorted(gold_zip_dir.glob("*_financials.parquet")) if f.exists()]
+    if not files:
         out_path.parent.mkdir(parents=True, exist_ok=True)
         pd.DataFrame().to_parquet(out_path, index=False)
         return out_path
 
-    panel = pd.concat(dfs, axis=0, ignore_index=True)
+    # One Arrow scan over all per-ZIP files (no list of frames + pd.concat).
+    # Quarters carry different canonical columns, so scan with the union of their
+    # schemas (permissive: all-null columns widen to the other files' types).
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    table = ds.dataset([str(f) for f in files], schema=schema, format="parquet").to_table()
+    panel = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
 
     # Recompute QC flags (safe even if some columns missing)
     panel = _qc_flags(panel)
@@ -34,5 +72,9 @@ def build_gold_all(
     panel = panel[id_cols + other_cols]
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    panel.to_parquet(out_path, index=False)
+    panel.to_parquet(
+        out_path, index=False, engine="pyarrow",
+        compression="zstd", compression_level=3,  # ~15-30% smaller than snappy, same read speed
+        row_group_size=128_000, use_dictionary=True,
+    )
     return out_path
@@ -4,67 +4,92 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Optional
 
+import uuid
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
 import yfinance as yf
 
 
-def _fetch_monthly_ohlcv_for_ticker(
+MONTHLY_COLS = ["date","open","high","low","close","adj_close","volume","ticker"]
+YF_BULK_BATCH = 100  # tickers per bulk yf.download call
+
+
+def _read_monthly_cache(
     ticker: str,
-    start: pd.Timestamp,
-    end: pd.Timestamp,
-    cache_dir: Optional[Path] = None,
-) -> pd.DataFrame:
+    cache_dir: Optional[Path],
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    columns: Optional[list[str]] = None,
+) -> Optional[pd.DataFrame]:
     """
-    Fetch monthly OHLCV for a single ticker between [start, end].
+    Cached monthly bars for `ticker` within [start, end], or None.
 
-    - Uses yfinance with interval="1mo"
-    - Optionally caches per-ticker data in cache_dir / f"{ticker}.parquet"
-    - Returns DataFrame with columns: ['date','open','high','low','close','adj_close','volume','ticker']
+    The cache is a year-partitioned dataset cache_dir / ticker / year=YYYY / *.parquet,
+    so the date filter prunes whole year files before anything is decoded.
     """
-    ticker = str(ticker).upper()
-
-    # ----- Cache path -----
-    df_cached = None
-    cache_path = None
-    if cache_dir is not None:
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_path = cache_dir / f"{ticker}.parquet"
-        if cache_path.exists():
-            try:
-                tmp = pd.read_parquet(cache_path)
-                # Only accept cache if it has a 'date' column
-                if "date" in tmp.columns:
-                    tmp["date"] = pd.to_datetime(tmp["date"])
-                    df_cached = tmp
-                else:
-                    print(f"[WARN] Cache for {ticker} missing 'date' column – ignoring old cache.")
-                    df_cached = None
-            except Exception as e:
-                print(f"[WARN] Failed to read cache for {ticker}: {e}")
-                df_cached = None
-
-    # If we have valid cached data, just filter to the requested window
-    if df_cached is not None and not df_cached.empty:
-        mask = (df_cached["date"] >= start) & (df_cached["date"] <= end)
-        df = df_cached.loc[mask].copy()
-        if not df.empty:
-            return df
-
-    # Otherwise fetch from Yahoo Finance
-    print(f"[INFO] Fetching monthly OHLCV for {ticker} from {start.date()} to {end.date()}")
-
-    data = yf.download(
-        tickers=ticker,
-        start=start.strftime("%Y-%m-%d"),
-        end=end.strftime("%Y-%m-%d"),
-        interval="1mo",
-        auto_adjust=False,
-        progress=False,
+    if cache_dir is None:
+        return None
+    cache_path = cache_dir / ticker
+    if not cache_path.is_dir():
+        return None
+
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+    try:
+        tmp = pd.read_parquet(cache_path, columns=columns, filters=filters or None)
+    except Exception as e:
+        print(f"[WARN] Failed to read cache for {ticker}: {e}")
+        return None
+    # Only accept cache if it has a 'date' column
+    if "date" not in tmp.columns:
+        print(f"[WARN] Cache for {ticker} missing 'date' column – ignoring old cache.")
+        return None
+    tmp = tmp.drop(columns=["year"], errors="ignore")  # partition key, not a bar field
+    tmp["date"] = pd.to_datetime(tmp["date"])
+    return tmp.sort_values("date", ignore_index=True)
+
+
+def _write_monthly_cache(ticker: str, cache_dir: Optional[Path], df: pd.DataFrame) -> None:
+    """
+    Append freshly fetched bars to the ticker's cache (if caching is enabled).
+    Only dates not cached yet are written, as new files in their year partitions;
+    existing files are never rewritten.
+    """
+    if cache_dir is None or df.empty:
+        return
+
+    have = _read_monthly_cache(ticker, cache_dir, df["date"].min(), df["date"].max(), columns=["date"])
+    if have is not None and not have.empty:
+        df = df[~df["date"].isin(have["date"])]
+        if df.empty:
+            return
+
+    table = pa.Table.from_pandas(df.assign(year=df["date"].dt.year.astype("int32")), preserve_index=False)
+    ds.write_dataset(
+        table,
+        base_dir=str(cache_dir / ticker),
+        format="parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
     )
 
-    if data.empty:
-        return pd.DataFrame(columns=["date","open","high","low","close","adj_close","volume","ticker"])
+
+def _tidy_monthly(data: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """yfinance OHLCV frame (Date index, Title-case columns) -> MONTHLY_COLS layout."""
+    data = data.drop(columns=["Dividends", "Stock Splits", "Capital Gains"], errors="ignore")
+    data = data.dropna(how="all")
+    if data.index.tz is not None:
+        data.index = data.index.tz_localize(None)  # exchange-local bar dates, like yf.download
+    data.index.name = "Date"
+    data.columns.name = None
 
     df = data.reset_index().rename(
         columns={
@@ -79,22 +104,165 @@ def _fetch_monthly_ohlcv_for_ticker(
     )
 
     df["date"] = pd.to_datetime(df["date"])
+    # Monthly prices need ~7 significant digits: float32 halves cache size and memory.
+    # Volume stays 64-bit (monthly share volume of large caps overflows int32).
+    for c in ["open", "high", "low", "close", "adj_close"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float32")
+    if "volume" in df.columns:
+        df["volume"] = pd.to_numeric(df["volume"], errors="coerce").astype("Int64")
     df["ticker"] = ticker
+    return df
+
+
+def _cache_covers(df_cached: Optional[pd.DataFrame], end: pd.Timestamp) -> bool:
+    """
+    True if the cached bars reach `end` (one month of slack for monthly bars).
+    Only the recent side can go stale; bars before the first cached one are taken
+    not to exist (the cache was filled from each ticker's own start).
+    """
+    if df_cached is None or df_cached.empty:
+        return False
+    return df_cached["date"].max() >= end - pd.DateOffset(months=1)
 
-    # Update/merge cache if caching is enabled
-    if cache_dir is not None and cache_path is not None:
-        if df_cached is not None and not df_cached.empty:
-            combined = (
-                pd.concat([df_cached, df], axis=0, ignore_index=True)
-                  .drop_duplicates(subset=["date"])
-                  .sort_values("date")
-            )
+
+def _fetch_monthly_ohlcv_bulk(
+    tickers: list[str],
+    start: pd.Series,
+    end: pd.Series,
+    cache_dir: Optional[Path] = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Monthly OHLCV for many tickers, as {ticker: frame}.
+
+    `start` / `end` hold each ticker's window (Series indexed by ticker).
+    Tickers whose cache already covers their window are served from cache; the rest
+    are fetched with one threaded yf.download per YF_BULK_BATCH tickers (instead of
+    one HTTP round trip per ticker) over the batch's overall window, split per
+    ticker and written back to the cache. Tickers without any data are missing
+    from the result.
+    """
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    out: dict[str, pd.DataFrame] = {}
+    missing = []
+    for tkr in tickers:
+        df_cached = _read_monthly_cache(tkr, cache_dir, start[tkr], end[tkr])
+        if _cache_covers(df_cached, end[tkr]):
+            out[tkr] = df_cached
         else:
-            combined = df.copy()
-        combined.to_parquet(cache_path, index=False)
+            missing.append(tkr)
+
+    if missing:
+        print(f"[INFO] Fetching monthly OHLCV for {len(missing)} tickers")
+
+    for i in range(0, len(missing), YF_BULK_BATCH):
+        batch = missing[i:i + YF_BULK_BATCH]
+        data = yf.download(
+            tickers=" ".join(batch),
+            start=start[batch].min().strftime("%Y-%m-%d"),
+            end=end[batch].max().strftime("%Y-%m-%d"),
+            interval="1mo",
+            group_by="ticker",
+            threads=True,
+            auto_adjust=False,
+            progress=False,
+        )
+        if data is None or data.empty:
+            continue
+
+        for tkr in batch:
+            if isinstance(data.columns, pd.MultiIndex):
+                if tkr not in data.columns.get_level_values(0):
+                    continue
+                part = data.xs(tkr, axis=1, level=0)
+            else:
+                part = data
+            if part.dropna(how="all").empty:
+                continue
+
+            df = _tidy_monthly(part, tkr)
+            _write_monthly_cache(tkr, cache_dir, df)
+            out[tkr] = df
+
+    return out
 
-    return df
 
+FY_FEATURE_COLS = [
+    "px_close_fy_end", "px_close_fy_start", "px_return_fy",
+    "px_high_fy", "px_low_fy", "px_vol_fy",
+]
+
+
+def _fy_window_features(px: pd.DataFrame, periods: pd.Series, lookback_months: int) -> np.ndarray:
+    """
+    FY window features of one ticker at each of its filing `periods`, as a
+    (len(periods), len(FY_FEATURE_COLS)) float array (columns in FY_FEATURE_COLS order).
+
+    A period's window is the calendar span (period - lookback_months, period] of
+    monthly bars, found by binary search on the bar dates; range max / min come from
+    one reduceat and the volatility from cumulative sums, so there is no per-filing
+    loop. Periods without any bar in their window get NaN.
+    """
+    out = np.full((len(periods), len(FY_FEATURE_COLS)), np.nan)
+    px = px.dropna(subset=["date"]).sort_values("date", ignore_index=True)
+    if px.empty:
+        return out
+
+    dates = px["date"].to_numpy(dtype="datetime64[ns]")
+    close = pd.to_numeric(px["close"], errors="coerce").to_numpy(dtype="float64")
+    high = pd.to_numeric(px["high"], errors="coerce").to_numpy(dtype="float64")
+    low = pd.to_numeric(px["low"], errors="coerce").to_numpy(dtype="float64")
+
+    # monthly log returns (first one in a window uses the bar before it, as before),
+    # one log pass over the array instead of a pandas log + diff
+    log_ret = np.full(len(close), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_close = np.log(close)
+    np.subtract(log_close[1:], log_close[:-1], out=log_ret[1:])
+
+    # bars [lo, hi) fall in (period - lookback_months, period]
+    period = pd.DatetimeIndex(periods)
+    window_start = period - pd.DateOffset(months=lookback_months)
+    lo = np.searchsorted(dates, window_start.to_numpy(dtype="datetime64[ns]"), side="right")
+    hi = np.searchsorted(dates, period.to_numpy(dtype="datetime64[ns]"), side="right")
+    has_bar = hi > lo
+
+    close_start = np.where(has_bar, close[np.minimum(lo, len(close) - 1)], np.nan)
+    close_end = np.where(has_bar, close[np.maximum(hi - 1, 0)], np.nan)
+
+    # Guard against zero / NaN at start: no close / return features then
+    bad_start = ~np.isfinite(close_start) | (close_start == 0)
+    close_start = np.where(bad_start, np.nan, close_start)
+    close_end = np.where(bad_start, np.nan, close_end)
+
+    # max / min over each [lo, hi): reduceat on interleaved bounds, NaN bars skipped
+    # (a trailing NaN keeps every bound a valid index)
+    bounds = np.column_stack([lo, hi]).ravel()
+    high_fy = np.fmax.reduceat(np.append(high, np.nan), bounds)[::2]
+    low_fy = np.fmin.reduceat(np.append(low, np.nan), bounds)[::2]
+
+    # sample std of the non-NaN log returns in each window, from prefix sums;
+    # a window holding an infinite return (zero close) gets NaN, like Series.std
+    is_nan = np.isnan(log_ret)
+    is_inf = np.isinf(log_ret)
+    r = np.where(is_nan | is_inf, 0.0, log_ret)
+    cnt, s1, s2, n_inf = (
+        np.concatenate([[0.0], np.cumsum(a)]) for a in (~is_nan, r, r * r, is_inf)
+    )
+    k = cnt[hi] - cnt[lo]
+    s = s1[hi] - s1[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.maximum((s2[hi] - s2[lo]) - s * s / k, 0.0) / (k - 1)
+    vol_fy = np.where((k >= 2) & (n_inf[hi] == n_inf[lo]), np.sqrt(var), np.nan)
+
+    out[:] = np.column_stack([
+        close_end, close_start, close_end / close_start - 1.0,
+        high_fy, low_fy, vol_fy,
+    ])
+    out[~has_bar] = np.nan
+    return out
 
 
 def attach_fy_ohlcv_to_panel(
@@ -117,6 +285,7 @@ def attach_fy_ohlcv_to_panel(
         px_low_fy         : min Low in window
         px_vol_fy         : std of monthly log-returns in window
 
+    Prices are fetched in bulk (see _fetch_monthly_ohlcv_bulk).
     Writes the enriched panel to `out_path` and returns that path.
     """
     panel = pd.read_parquet(panel_path)
@@ -128,96 +297,48 @@ def attach_fy_ohlcv_to_panel(
     if not {"ticker", "period"}.issubset(panel.columns):
         raise ValueError("Panel must contain 'ticker' and 'period' columns.")
 
-    df = panel.copy()
-    df["ticker"] = df["ticker"].astype(str).str.upper()
+    # RangeIndex: row labels double as positions for the vectorised assignment below
+    df = panel.reset_index(drop=True)
+    # upper-case each distinct ticker once (categories), written back as plain strings
+    tkr = df["ticker"].astype(str).astype("category")
+    df["ticker"] = tkr.cat.categories.str.upper().to_numpy(dtype=object)[tkr.cat.codes.to_numpy()]
     df["period"] = pd.to_datetime(df["period"])
 
     # We will build features per ticker to reuse downloaded data
-    unique_tickers = df["ticker"].dropna().unique().tolist()
-    print(f"[INFO] Building OHLCV features for {len(unique_tickers)} tickers")
-
-    # Prepare empty columns for features
-    df["px_close_fy_end"] = np.nan
-    df["px_close_fy_start"] = np.nan
-    df["px_return_fy"] = np.nan
-    df["px_high_fy"] = np.nan
-    df["px_low_fy"] = np.nan
-    df["px_vol_fy"] = np.nan
-
-    for tkr in unique_tickers:
-        mask_t = df["ticker"] == tkr
-        df_t = df.loc[mask_t].copy()
-        if df_t.empty:
-            continue
-
-        # For this ticker, we only need prices between
-        # (min(period) - lookback) and (max(period))
-        min_period = df_t["period"].min()
-        max_period = df_t["period"].max()
-
-        start_global = min_period - pd.DateOffset(months=lookback_months + 1)
-        end_global = max_period
+    # (.indices are positions within the dated rows: map them back to df positions)
+    dated = np.flatnonzero(df["period"].notna().to_numpy())
+    rows_by_ticker = {
+        t: dated[pos] for t, pos in df.iloc[dated].groupby("ticker").indices.items()
+    }
+    print(f"[INFO] Building OHLCV features for {len(rows_by_ticker)} tickers")
+
+    # Feature values are collected in one positional array and written once at the end
+    feat = np.full((len(df), len(FY_FEATURE_COLS)), np.nan)
+
+    # For each ticker, we only need prices between
+    # (min(period) - lookback) and (max(period)) -- one groupby for all tickers
+    bounds = df.groupby("ticker")["period"].agg(["min", "max"])
+    bounds["min"] = bounds["min"] - pd.DateOffset(months=lookback_months + 1)
+
+    # Bulk fetch (cache hits skip the network; misses go out YF_BULK_BATCH at a time)
+    px_by_ticker = _fetch_monthly_ohlcv_bulk(
+        list(rows_by_ticker),
+        start=bounds["min"],
+        end=bounds["max"],
+        cache_dir=cache_dir,
+    )
 
-        px = _fetch_monthly_ohlcv_for_ticker(
-            ticker=tkr,
-            start=start_global,
-            end=end_global,
-            cache_dir=cache_dir,
-        )
-        if px.empty:
+    for tkr, rows in rows_by_ticker.items():
+        px = px_by_ticker.get(tkr)
+        if px is None or px.empty:
             print(f"[WARN] No price data for {tkr}")
             continue
 
-        px = px.sort_values("date")
-
-        # Ensure numeric close/high/low
-        px["close"] = pd.to_numeric(px["close"], errors="coerce")
-        px["high"] = pd.to_numeric(px["high"], errors="coerce")
-        px["low"] = pd.to_numeric(px["low"], errors="coerce")
-
-
-        # Pre-compute monthly log returns for volatility
-        px["log_ret"] = np.log(px["close"]).diff()
+        # All filing rows of the ticker at once
+        feat[rows] = _fy_window_features(px, df["period"].iloc[rows], lookback_months)
 
-        # For each filing row of this ticker, compute features from window
-        for idx_row, row in df_t.iterrows():
-            period_date = row["period"]
-            window_start = period_date - pd.DateOffset(months=lookback_months)
-
-            win = px[(px["date"] > window_start) & (px["date"] <= period_date)]
-            if win.empty:
-                continue
-
-            # Make sure close is numeric
-            win_close = pd.to_numeric(win["close"], errors="coerce")
-
-            # End and start close as scalars
-            close_end = float(win_close.iloc[-1])
-            close_start = float(win_close.iloc[0])
-
-            # Guard against zero / NaN at start
-            if not np.isfinite(close_start) or close_start == 0:
-                px_close_fy_start = np.nan
-                px_close_fy_end = np.nan
-                px_return_fy = np.nan
-            else:
-                px_close_fy_start = close_start
-                px_close_fy_end = close_end
-                px_return_fy = (px_close_fy_end / px_close_fy_start) - 1.0
-
-            px_high_fy = win["high"].max()
-            px_low_fy = win["low"].min()
-            # Vol of monthly log-returns in window
-            win_log_ret = win["log_ret"].dropna()
-            px_vol_fy = win_log_ret.std() if not win_log_ret.empty else np.nan
-
-            # Assign back into main df
-            df.at[idx_row, "px_close_fy_end"] = px_close_fy_end
-            df.at[idx_row, "px_close_fy_start"] = px_close_fy_start
-            df.at[idx_row, "px_return_fy"] = px_return_fy
-            df.at[idx_row, "px_high_fy"] = px_high_fy
-            df.at[idx_row, "px_low_fy"] = px_low_fy
-            df.at[idx_row, "px_vol_fy"] = px_vol_fy
+    for j, col in enumerate(FY_FEATURE_COLS):
+        df[col] = feat[:, j]
 
     # Save enriched panel
     out_path.parent.mkdir(parents=True, exist_ok=True)
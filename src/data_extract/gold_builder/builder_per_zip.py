@@ -1,11 +1,31 @@
 from __future__ import annotations
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# 🔑 List of metadata/ID-like columns we only want from META
+META_ID_COLS = [
+    "cik","fy","filed","period","name","sic",
+    "form","fp",               # these caused the error
+    "instance","fye","accepted",
+    "countryba","stprba",
+    "ticker","source_zip",
+]
+
+# Quarter-partitioned copy of the per-ZIP gold files
+GOLD_DATASET_DIR = "financials"
+GOLD_PARTITIONING = ds.partitioning(pa.schema([("source_zip", pa.string())]), flavor="hive")
 
 def _dedup_cols(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
-    return df.loc[:, ~df.columns.duplicated()].copy()
+    dup = df.columns.duplicated()
+    if not dup.any():
+        return df
+    return df.loc[:, ~dup].copy()
 
 def _outer_join(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
     right = _dedup_cols(right)
@@ -15,22 +35,56 @@ def _outer_join(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
     # suffixes can safely be blank
     return pd.merge(left, right, on="adsh", how="outer", suffixes=("", ""))
 
-def _safe_read(path: Path) -> pd.DataFrame:
+def _value_part(part: pd.DataFrame) -> pd.DataFrame:
+    """adsh + statement value columns of a silver part (META_ID_COLS come from META)."""
+    if part.empty:
+        return part
+    part = _dedup_cols(part)
+    return part[["adsh"] + [c for c in part.columns if c not in META_ID_COLS and c != "adsh"]]
+
+def _safe_read(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
     if path.exists():
-        return pd.read_parquet(path)
+        return pd.read_parquet(path, columns=columns, engine="pyarrow")
     return pd.DataFrame()
 
+def _parquet_columns(path: Path, keep_meta: bool) -> list[str] | None:
+    """
+    Columns to project when reading a silver file (footer-only schema read).
+    keep_meta=True  -> adsh + META_ID_COLS present in the file
+    keep_meta=False -> adsh + every non-META column (the statement values)
+    """
+    if not path.exists():
+        return None
+    names = pq.ParquetFile(path).schema_arrow.names
+    if keep_meta:
+        cols = [c for c in names if c in META_ID_COLS]
+    else:
+        cols = [c for c in names if c not in META_ID_COLS and c != "adsh"]
+    return (["adsh"] if "adsh" in names else []) + list(dict.fromkeys(cols))
+
 def _latest_per_cik_fy(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     keep_cols = [c for c in ["cik","fy","filed"] if c in df.columns]
     if len(keep_cols) < 3:
         return df
+    # One hash groupby pass instead of sorting the whole frame. Same pick as the old
+    # sort_values(["cik","fy","filed"]) + drop_duplicates(keep="last"): latest filed,
+    # missing filed counts as latest (NaN sorted last), and on ties the last row wins
+    # (idxmax takes the first max, so scan the rows in reverse).
+    df = df.reset_index(drop=True)
+    filed = pd.to_datetime(df["filed"], errors="coerce").fillna(pd.Timestamp.max).iloc[::-1]
+    keep_idx = filed.groupby([df["cik"], df["fy"]], sort=False, dropna=False).idxmax()
+    # only the kept rows are sorted, to keep the old (cik, fy) output order
     return (
-        df.sort_values(["cik","fy","filed"])
-          .drop_duplicates(["cik","fy"], keep="last")
+        df.loc[keep_idx.to_numpy()]
+          .sort_values(["cik","fy"], kind="stable")
+          .reset_index(drop=True)
     )
 
+def _f64(s: pd.Series) -> np.ndarray:
+    return s.to_numpy(dtype="float64", na_value=np.nan)
+
 def _qc_flags(df: pd.DataFrame) -> pd.DataFrame:
     has = df.columns
 
@@ -40,11 +94,14 @@ def _qc_flags(df: pd.DataFrame) -> pd.DataFrame:
     ta = "TotalAssets" in has
     te = "TemporaryEquity" in has
     if ta and tl and se:
-        rhs = df["TotalLiabilities"].fillna(0) + df["ShareholdersEquity"].fillna(0)
+        # plain float64 arrays: in-place adds instead of a new Series per op
+        rhs = np.nan_to_num(_f64(df["TotalLiabilities"]), nan=0.0)
+        rhs += np.nan_to_num(_f64(df["ShareholdersEquity"]), nan=0.0)
         if te:
-            rhs = rhs + df["TemporaryEquity"].fillna(0)
-        df["bs_diff"] = (df["TotalAssets"] - rhs).abs()
-        df["bs_balanced_flag"] = df["bs_diff"] <= 1_000  # $1k tolerance
+            rhs += np.nan_to_num(_f64(df["TemporaryEquity"]), nan=0.0)
+        bs_diff = np.abs(_f64(df["TotalAssets"]) - rhs)  # NaN assets -> NaN diff -> not balanced
+        df["bs_diff"] = bs_diff
+        df["bs_balanced_flag"] = bs_diff <= 1_000.0  # $1k tolerance
     else:
         df["bs_balanced_flag"] = pd.NA
 
@@ -54,9 +111,10 @@ def _qc_flags(df: pd.DataFrame) -> pd.DataFrame:
             df["cf_balanced_flag"] = pd.NA
             break
     else:
-        delta = df[["CFO","CFI","CFF"]].sum(axis=1, skipna=True)
-        df["cf_delta_abs"] = delta.abs()
-        df["cf_balanced_flag"] = df["cf_delta_abs"] <= 1_000
+        cf = np.column_stack([_f64(df[c]) for c in ["CFO","CFI","CFF"]])
+        cf_delta_abs = np.abs(np.nansum(cf, axis=1))
+        df["cf_delta_abs"] = cf_delta_abs
+        df["cf_balanced_flag"] = cf_delta_abs <= 1_000.0
 
     # Coverage score over key set (using canonical names)
     key_cols = [c for c in [
@@ -91,14 +149,18 @@ def build_gold_zip(
     sh_path   = silver_dir / f"shares/year_quarter={yq}/shares.parquet"
     meta_path = silver_dir / f"meta/year_quarter={yq}/meta.parquet"
 
-    bs   = _safe_read(bs_path)
-    is_  = _safe_read(is_path)
-    cf   = _safe_read(cf_path)
-    sh   = _safe_read(sh_path)
-    meta = _safe_read(meta_path)
+    meta = _safe_read(meta_path, _parquet_columns(meta_path, keep_meta=True))
+
+    # With metadata present the parts only contribute values: skip their ID
+    # columns at read time. Without it they are read whole (fallback ID grid).
+    parts = [bs_path, is_path, cf_path, sh_path]
+    if meta.empty:
+        bs, is_, cf, sh = (_safe_read(p) for p in parts)
+    else:
+        bs, is_, cf, sh = (_safe_read(p, _parquet_columns(p, keep_meta=False)) for p in parts)
 
     # Start with metadata (preferred ID grid)
-    df = _dedup_cols(meta.copy())
+    df = _dedup_cols(meta)
     if df.empty:
         # Fallback: reconstruct IDs from whatever exists
         dfs = [d for d in [bs, is_, cf, sh] if not d.empty]
@@ -117,31 +179,22 @@ def build_gold_zip(
             if dup in df.columns:
                 df[col] = df[col].fillna(df[dup])
                 df = df.drop(columns=[dup])
-    # 🔑 List of metadata/ID-like columns we only want from META
-    META_ID_COLS = [
-        "cik","fy","filed","period","name","sic",
-        "form","fp",               # these caused the error
-        "instance","fye","accepted",
-        "countryba","stprba",
-        "ticker","source_zip",
-    ]
-
-    # Outer-join BS/IS/CF (drop all meta-ish cols from right)
-    for part in [bs, is_, cf]:
-        if not part.empty:
-            part = _dedup_cols(part)
-            drop_cols = [c for c in META_ID_COLS if c in part.columns]
-            non_id_cols = [c for c in part.columns if c not in drop_cols and c != "adsh"]
-            keep = ["adsh"] + non_id_cols
-            df = _outer_join(df, part[keep])
-
-    # Left-join Shares similarly (no extra IDs from right)
-    if not sh.empty:
-        sh = _dedup_cols(sh)
-        drop_cols = [c for c in META_ID_COLS if c in sh.columns]
-        non_id_cols = [c for c in sh.columns if c not in drop_cols and c != "adsh"]
-        keep = ["adsh"] + non_id_cols
-        df = pd.merge(df, sh[keep], on="adsh", how="left")
+    # Outer-join BS/IS/CF, left-join Shares (drop all meta-ish cols from right)
+    parts = [p for p in (_value_part(bs), _value_part(is_), _value_part(cf)) if not p.empty]
+    sh = _value_part(sh)
+
+    if all(f["adsh"].is_unique for f in [df, *parts, sh] if not f.empty):
+        # One filing per row everywhere: align all parts on an adsh index in a
+        # single concat instead of copying the growing frame once per merge
+        df = pd.concat([f.set_index("adsh") for f in [df, *parts]], axis=1, join="outer")
+        if not sh.empty:
+            df = pd.concat([df, sh.set_index("adsh").reindex(df.index)], axis=1)
+        df = df.rename_axis("adsh").reset_index()
+    else:
+        for part in parts:
+            df = _outer_join(df, part)
+        if not sh.empty:
+            df = pd.merge(df, sh, on="adsh", how="left")
 
     # Deduplicate per (cik, fy) keep latest filed
     df = _latest_per_cik_fy(df)
@@ -155,4 +208,16 @@ def build_gold_zip(
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"{yq}_financials.parquet"
     df.to_parquet(out_path, index=False)
+
+    # Same rows into the Hive-partitioned gold dataset (gold/financials/source_zip=YYYYq#/),
+    # replacing this quarter's partition on rebuilds -- see builder_all.load_gold
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        out_dir / GOLD_DATASET_DIR,
+        format="parquet",
+        partitioning=GOLD_PARTITIONING,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd", use_dictionary=True),
+    )
     return out_path
\ No newline at end of file
@@ -1,3 +1,6 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from src.data_extract.silver_transformer.transformer_bs import transform_balance_sheet_to_wide
 from src.data_extract.silver_transformer.transformer_is import transform_income_statement_to_wide
@@ -33,3 +36,39 @@ def build_everything_for_zip(yq: str, raw_dir: Path, silver_dir: Path, gold_dir:
     transform_metadata_to_wide(zip_path, out_path=silver_dir / f"meta/year_quarter={yq}/meta.parquet")
     # 2) Gold-Z
     return build_gold_zip(yq, silver_dir, gold_dir)
+
+
+def build_everything_for_zips(
+    raw_dir: Path,
+    silver_dir: Path,
+    gold_dir: Path,
+    yqs=None,
+    max_workers: int | None = None,
+    max_tasks_per_child: int = 4,
+) -> dict:
+    """
+    Run build_everything_for_zip for many quarters in parallel, one process per ZIP.
+
+    Each ZIP is independent and its parsing/joins are CPU-bound, so processes
+    (not threads) are used. Workers are recycled every `max_tasks_per_child`
+    ZIPs to hand the large sub/pre/num frames' memory back to the OS.
+
+    yqs defaults to every quarter from gen_yqs().
+    Returns {yq: gold path}; a failing quarter is reported and skipped.
+    """
+    yqs = gen_yqs() if yqs is None else list(yqs)
+    max_workers = min(max_workers or os.cpu_count(), max(len(yqs), 1))
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=max_tasks_per_child) as ex:
+        futures = {
+            ex.submit(build_everything_for_zip, yq, raw_dir, silver_dir, gold_dir): yq
+            for yq in yqs
+        }
+        for fut in as_completed(futures):
+            yq = futures[fut]
+            try:
+                results[yq] = fut.result()
+                print(f"[INFO] {yq} -> {results[yq]}")
+            except Exception as e:
+                print(f"[WARN] {yq} failed: {e}")
+    return results
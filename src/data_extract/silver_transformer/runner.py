@@ -0,0 +1,32 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import pandas as pd
+
+
+def run_parallel(fn, zips, max_workers: int | None = None, max_tasks_per_child: int = 4, **kw) -> pd.DataFrame:
+    """
+    Run one silver transformer over many FSDS ZIPs, one process per ZIP, and
+    stack the wide frames.
+
+    e.g. run_parallel(transform_balance_sheet_to_wide, [raw / "2025q2.zip", raw / "2025q1.zip"], fp="FY")
+
+    - `fn` must be a module-level transformer (picklable); `kw` is passed to every call
+    - results keep the order of `zips`; empty quarters are skipped
+    - workers are recycled every `max_tasks_per_child` ZIPs to release sub/num memory
+    """
+    if kw.get("return_unknown"):
+        raise ValueError("run_parallel stacks wide frames only; call fn per ZIP for return_unknown=True")
+
+    zips = list(zips)
+    if not zips:
+        return pd.DataFrame()
+
+    max_workers = min(max_workers or os.cpu_count(), len(zips))
+    with ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=max_tasks_per_child) as ex:
+        frames = [w for w in ex.map(partial(fn, **kw), zips) if not w.empty]
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
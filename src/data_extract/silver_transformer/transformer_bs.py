@@ -3,10 +3,14 @@
 from __future__ import annotations
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from src.data_extract.bronze_extractor.extractor_bs import extract_balance_sheets
+from src.data_extract.bronze_extractor.fsds_loader import stmt_mask, map_categorical
 from src.data_extract.config.tag_map_min import UOM_MULTIPLIERS, MONETARY_UOMS
 from src.data_extract.config.tag_map_min import BS as BS_TAGMAP
+from src.data_extract.config.tag_map_min import TAG_TO_CANON_BY_SECTION, PREF_RANK_BY_SECTION, tag_pref_rank
 from src.data_extract.config.forms import ALL_FORMS
 
 
@@ -19,14 +23,12 @@ def _reverse_map(forward: dict[str, list[str]]) -> dict[str, str]:
     return rev
 
 
-def _uom_mult(u) -> float:
-    if pd.isna(u):
-        return 1.0
-    ul = str(u).lower()
-    for k, v in UOM_MULTIPLIERS.items():
-        if ul == k.lower():
-            return v
-    return 1.0
+# Lookups for the default BS_TAGMAP, built once at import instead of per ZIP
+_BS_REVERSE = TAG_TO_CANON_BY_SECTION["BS"]
+_BS_PREF_RANK = PREF_RANK_BY_SECTION["BS"]
+
+# lower-cased uom -> multiplier, for one vectorised .map (unknown / missing uom -> 1.0)
+_UOM_MULT_LOWER = {k.lower(): v for k, v in UOM_MULTIPLIERS.items()}
 
 
 def transform_balance_sheet_to_wide(
@@ -58,62 +60,53 @@ def transform_balance_sheet_to_wide(
     if forms is None:
         forms = ALL_FORMS
 
-    mask = bs_long["form"].isin(forms)
+    # form / fp / uom hold a handful of distinct labels: test (and upper-case)
+    # the categories once, then broadcast to rows through the integer codes
+    mask = bs_long["form"].astype("category").isin(forms)
 
     if fp is not None:
-        fp_upper = bs_long["fp"].astype(str).str.upper()
-        if isinstance(fp, (list, tuple, set)):
-            fp_vals = {str(x).upper() for x in fp}
-            mask = mask & fp_upper.isin(fp_vals)
-        else:
-            mask = mask & (fp_upper == str(fp).upper())
-
-    bs_long = bs_long[mask].copy()
-    if bs_long.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+        fp_vals = {str(x).upper() for x in fp} if isinstance(fp, (list, tuple, set)) else {str(fp).upper()}
+        mask = mask & stmt_mask(bs_long["fp"].astype("category"), lambda labels: labels.isin(fp_vals))
 
     # 3) Instant logic: qtrs == '0' and ddate == period
     q = bs_long["qtrs"].fillna("0").astype(str)
-    mask_instant = (q == "0") & (bs_long["ddate"] == bs_long["period"])
-    bs_long = bs_long[mask_instant].copy()
-    if bs_long.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+    mask = mask & (q == "0") & (bs_long["ddate"] == bs_long["period"])
 
     # 4) Monetary-only + unit normalisation
     monetary_uoms = {u.lower() for u in MONETARY_UOMS}
-    bs_long = bs_long[bs_long["uom"].astype(str).str.lower().isin(monetary_uoms)].copy()
-
-    bs_long["value"] = pd.to_numeric(bs_long["value"], errors="coerce")
-    bs_long["value"] = bs_long["value"] * bs_long["uom"].map(_uom_mult)
+    uom = bs_long["uom"].astype(str).astype("category")
+    uom_lower = uom.cat.categories.str.lower()
+    mask = mask & uom.isin(uom.cat.categories[uom_lower.isin(monetary_uoms)])
+    keep = mask.to_numpy()
+    bs_long = bs_long[keep].copy()  # only subset + copy: "value" is rewritten next
+
+    cat_mult = uom_lower.map(_UOM_MULT_LOWER).to_numpy(dtype="float64", na_value=1.0)
+    mult = cat_mult[uom.cat.codes.to_numpy()[keep]]
+    bs_long["value"] = pd.to_numeric(bs_long["value"], errors="coerce") * mult
     bs_long = bs_long.dropna(subset=["value"])
     if bs_long.empty:
         return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
 
     # 5) Map XBRL tag -> canonical BS item
-    reverse = _reverse_map(tag_map)
-    bs_long["canon"] = bs_long["tag"].map(reverse)
+    reverse = _BS_REVERSE if tag_map is BS_TAGMAP else _reverse_map(tag_map)
+    bs_long["canon"] = map_categorical(bs_long["tag"], reverse)
 
-    unknown = bs_long[bs_long["canon"].isna()].copy()
-    mapped = bs_long[bs_long["canon"].notna()].copy()
+    has_canon = bs_long["canon"].notna()
+    unknown = bs_long[~has_canon]
+    mapped = bs_long[has_canon].copy()
     if mapped.empty:
         return (pd.DataFrame(), unknown) if return_unknown else pd.DataFrame()
 
     # 6) Resolve collisions (prefer first-listed synonym; tie-break |value|)
-    pref_rank: dict[tuple[str, str], int] = {}
-    for canon, syns in tag_map.items():
-        order = [canon, *(syns or [])]
-        for i, t in enumerate(order):
-            pref_rank[(canon, t)] = i
-
-    mapped["__rank"] = mapped.apply(
-        lambda r: pref_rank.get((r["canon"], r["tag"]), 10_000), axis=1
-    )
+    pref_rank = _BS_PREF_RANK if tag_map is BS_TAGMAP else tag_pref_rank(tag_map)
+    mapped["__rank"] = map_categorical(mapped["tag"], pref_rank, fill_value=10_000, dtype="float64")
     mapped["__abs"] = mapped["value"].abs()
 
+    # sort on the two tie-break keys only; head(1) is a hash pass over (adsh, canon)
     mapped = (
-        mapped.sort_values(["adsh", "canon", "__rank", "__abs"],
-                           ascending=[True, True, True, False])
-              .drop_duplicates(["adsh", "canon"], keep="first")
+        mapped.sort_values(["__rank", "__abs"], ascending=[True, False], kind="stable")
+              .groupby(["adsh", "canon"], sort=False)
+              .head(1)
               .drop(columns=["__rank", "__abs"])
     )
 
@@ -121,14 +114,20 @@ def transform_balance_sheet_to_wide(
     index_cols = ["adsh", "cik", "name", "form", "fy", "fp", "filed", "period", "sic"]
     index_cols = [c for c in index_cols if c in mapped.columns]
 
-    wide = (
-        mapped.pivot_table(index=index_cols, columns="canon", values="value", aggfunc="first")
-              .reset_index()
-    )
-    wide.columns.name = None
+    # (adsh, canon) is unique after step 6, so a plain pivot on adsh suffices;
+    # the filing metadata (one row per adsh) is joined back afterwards
+    values = mapped.pivot(index="adsh", columns="canon", values="value")
+    values.columns.name = None
+    ids = mapped[index_cols].drop_duplicates("adsh").set_index("adsh")
+    wide = ids.join(values, how="inner", sort=True).reset_index()
 
     if out_path is not None:
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        wide.to_parquet(out_path, index=False)
+        tbl = pa.Table.from_pandas(wide, preserve_index=False)
+        pq.write_table(
+            tbl, str(out_path),
+            compression="zstd", compression_level=3,
+            row_group_size=64 * 1024, use_dictionary=True,
+        )
 
     return (wide, unknown) if return_unknown else wide
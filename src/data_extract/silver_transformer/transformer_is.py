@@ -3,8 +3,10 @@ from pathlib import Path
 import pandas as pd
 
 from src.data_extract.bronze_extractor.extractor_is import extract_income_statements
+from src.data_extract.bronze_extractor.fsds_loader import stmt_mask, map_categorical
 from src.data_extract.config.tag_map_min import UOM_MULTIPLIERS, MONETARY_UOMS
 from src.data_extract.config.tag_map_min import IS as IS_TAGMAP
+from src.data_extract.config.tag_map_min import TAG_TO_CANON_BY_SECTION, PREF_RANK_BY_SECTION, tag_pref_rank
 from src.data_extract.config.forms import ANNUAL_FORMS, QUARTERLY_FORMS, ALL_FORMS
 
 
@@ -16,14 +18,12 @@ def _reverse_map(forward: dict[str, list[str]]) -> dict[str, str]:
     return rev
 
 
-def _uom_mult(u) -> float:
-    if pd.isna(u):
-        return 1.0
-    ul = str(u).lower()
-    for k, v in UOM_MULTIPLIERS.items():
-        if ul == k.lower():
-            return v
-    return 1.0
+# Lookups for the default IS_TAGMAP, built once at import instead of per ZIP
+_IS_REVERSE = TAG_TO_CANON_BY_SECTION["IS"]
+_IS_PREF_RANK = PREF_RANK_BY_SECTION["IS"]
+
+# lower-cased uom -> multiplier (unknown / missing uom -> 1.0 via fillna)
+_UOM_MULT_LOWER = {k.lower(): float(v) for k, v in UOM_MULTIPLIERS.items()}
 
 
 def transform_income_statement_to_wide(
@@ -56,82 +56,79 @@ def transform_income_statement_to_wide(
     if forms is None:
         forms = ALL_FORMS
 
-    mask = is_long["form"].isin(forms)
+    # form / fp / qtrs / uom hold a handful of distinct labels: test (and case-fold)
+    # the categories once, then broadcast to rows through the integer codes
+    form = is_long["form"].astype("category")
+    mask = form.isin(forms)
 
     # Optional fiscal period filter (fp=None means keep all FP)
     if fp is not None:
-        fp_upper = is_long["fp"].astype(str).str.upper()
-        if isinstance(fp, (list, tuple, set)):
-            fp_vals = {str(x).upper() for x in fp}
-            mask = mask & fp_upper.isin(fp_vals)
-        else:
-            mask = mask & (fp_upper == str(fp).upper())
-
-    is_long = is_long[mask].copy()
-    if is_long.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+        fp_vals = {str(x).upper() for x in fp} if isinstance(fp, (list, tuple, set)) else {str(fp).upper()}
+        mask = mask & stmt_mask(is_long["fp"].astype("category"), lambda labels: labels.isin(fp_vals))
 
     # 3) Duration logic:
     #    - annual 10-Ks: qtrs == '4'
     #    - quarterly 10-Qs: qtrs in {'1','2','3'}
-    is_10k = is_long["form"].isin(ANNUAL_FORMS)
-    is_10q = is_long["form"].isin(QUARTERLY_FORMS)
+    is_10k = form.isin(ANNUAL_FORMS)
+    is_10q = form.isin(QUARTERLY_FORMS)
+    qtrs = is_long["qtrs"].astype("category")
 
     mask_dur = (
-        (is_10k & (is_long["qtrs"] == "4")) |
-        (is_10q & is_long["qtrs"].isin(["1", "2", "3"]))
+        (is_10k & (qtrs == "4")) |
+        (is_10q & qtrs.isin(["1", "2", "3"]))
     )
 
     # align duration end date with period end
-    mask_dur = mask_dur & (is_long["ddate"] == is_long["period"])
-    is_long = is_long[mask_dur].copy()
-
-    if is_long.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+    mask = mask & mask_dur & (is_long["ddate"] == is_long["period"])
 
     # 4) Monetary-only + normalization
     monetary_uoms = {u.lower() for u in MONETARY_UOMS}
-    is_long = is_long[is_long["uom"].astype(str).str.lower().isin(monetary_uoms)].copy()
+    uom = is_long["uom"].astype(str).astype("category")
+    uom_lower = uom.cat.categories.str.lower()
+    mask = mask & uom.isin(uom.cat.categories[uom_lower.isin(monetary_uoms)]) & is_long["value"].notna()
+    keep = mask.to_numpy()
+
+    # one subset + copy for all filters above ("value" is rewritten next)
+    is_long = is_long[keep].copy()
 
-    is_long["value"] = pd.to_numeric(is_long["value"], errors="coerce")
-    is_long["value"] = is_long["value"] * is_long["uom"].map(_uom_mult)
+    cat_mult = uom_lower.map(_UOM_MULT_LOWER).to_numpy(dtype="float64", na_value=1.0)
+    mult = cat_mult[uom.cat.codes.to_numpy()[keep]]
+    is_long["value"] = pd.to_numeric(is_long["value"], errors="coerce").to_numpy() * mult
     is_long = is_long.dropna(subset=["value"])
     if is_long.empty:
         return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
 
     # 5) Map raw tags -> canonical
-    reverse = _reverse_map(tag_map)
-    is_long["canon"] = is_long["tag"].map(reverse)
+    reverse = _IS_REVERSE if tag_map is IS_TAGMAP else _reverse_map(tag_map)
+    is_long["canon"] = map_categorical(is_long["tag"], reverse)
 
-    unknown = is_long[is_long["canon"].isna()].copy()
-    mapped = is_long[is_long["canon"].notna()].copy()
+    has_canon = is_long["canon"].notna()
+    unknown = is_long[~has_canon]
+    mapped = is_long[has_canon].copy()
     if mapped.empty:
         return (pd.DataFrame(), unknown) if return_unknown else pd.DataFrame()
 
     # 6) Resolve collisions per (adsh, canon)
-    pref_rank = {}
-    for canon, syns in tag_map.items():
-        order = [canon, *(syns or [])]
-        for i, t in enumerate(order):
-            pref_rank[(canon, t)] = i
-
-    mapped["__rank"] = mapped.apply(lambda r: pref_rank.get((r["canon"], r["tag"]), 10_000), axis=1)
+    pref_rank = _IS_PREF_RANK if tag_map is IS_TAGMAP else tag_pref_rank(tag_map)
+    mapped["__rank"] = map_categorical(mapped["tag"], pref_rank, fill_value=10_000, dtype="float64")
     mapped["__abs"] = mapped["value"].abs()
 
+    # sort on the two tie-break keys only; head(1) is a hash pass over (adsh, canon)
     mapped = (
-        mapped.sort_values(["adsh", "canon", "__rank", "__abs"],
-                           ascending=[True, True, True, False])
-              .drop_duplicates(["adsh", "canon"], keep="first")
+        mapped.sort_values(["__rank", "__abs"], ascending=[True, False], kind="stable")
+              .groupby(["adsh", "canon"], sort=False)
+              .head(1)
               .drop(columns=["__rank", "__abs"])
     )
 
     # 7) Pivot long -> wide (one row per filing)
     index_cols = ["adsh", "cik", "name", "form", "fy", "fp", "filed", "period", "sic"]
-    wide = (
-        mapped.pivot_table(index=index_cols, columns="canon", values="value", aggfunc="first")
-              .reset_index()
-    )
-    wide.columns.name = None
+    # (adsh, canon) is unique after collision resolution: reshape on adsh
+    # alone, then join back the one-row-per-filing ID columns
+    values = mapped.pivot(index="adsh", columns="canon", values="value")
+    values.columns.name = None
+    ids = mapped[index_cols].drop_duplicates("adsh").set_index("adsh")
+    wide = ids.join(values, how="inner", sort=True).reset_index()
 
     # (Optional) you can still dedupe per (cik, fy, fp) or leave filing-level
     # For now, keep one row per filing (adsh)
@@ -139,6 +136,10 @@ def transform_income_statement_to_wide(
     # 8) Persist
     if out_path is not None:
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        wide.to_parquet(out_path, index=False)
+        wide.to_parquet(
+            out_path, index=False, engine="pyarrow",
+            compression="zstd", compression_level=3,
+            row_group_size=64 * 1024, use_dictionary=True,
+        )
 
     return (wide, unknown) if return_unknown else wide
@@ -27,13 +27,29 @@ def transform_metadata_to_wide(
         return pd.DataFrame()
 
     # Already one row per filing (adsh) from bronze; just sort for sanity
+    # FSDS filed is a YYYYMMDD string, which sorts chronologically as-is:
+    # sort first (stable), then parse it once with an explicit format
+    filed_is_ymd = "filed" in idx.columns and idx["filed"].dropna().astype(str).str.fullmatch(r"\d{8}").all()
+    if "filed" in idx.columns and not filed_is_ymd:
+        idx["filed"] = pd.to_datetime(idx["filed"], errors="coerce", cache=True)
+
     sort_cols = [c for c in ["cik", "fy", "fp", "filed"] if c in idx.columns]
     if sort_cols:
-        idx["filed"] = pd.to_datetime(idx["filed"], errors="coerce")
-        idx = idx.sort_values(sort_cols, na_position="last")
+        idx = idx.sort_values(sort_cols, na_position="last", kind="mergesort")
+
+    if filed_is_ymd:
+        idx["filed"] = pd.to_datetime(idx["filed"], format="%Y%m%d", errors="coerce", cache=True)
+
+    # FSDS period is a YYYYMMDD string; store it as a real timestamp so readers skip parsing
+    if "period" in idx.columns:
+        idx["period"] = pd.to_datetime(idx["period"], format="%Y%m%d", errors="coerce")
 
     if out_path is not None:
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        idx.to_parquet(out_path, index=False)
+        idx.to_parquet(
+            out_path, index=False, engine="pyarrow",
+            compression="zstd", compression_level=3,
+            row_group_size=128_000, use_dictionary=True,
+        )
 
     return idx
@@ -4,8 +4,9 @@ from __future__ import annotations
 from pathlib import Path
 import pandas as pd
 
-from src.data_extract.bronze_extractor.fsds_loader import load_fsds_from_zip
+from src.data_extract.bronze_extractor.fsds_loader import load_fsds_from_zip, stmt_mask, map_categorical
 from src.data_extract.config.tag_map_min import SHARES as SHARES_TAGMAP
+from src.data_extract.config.tag_map_min import TAG_TO_CANON_BY_SECTION, PREF_RANK_BY_SECTION, tag_pref_rank
 from src.data_extract.config.forms import ALL_FORMS
 
 
@@ -17,11 +18,21 @@ def _reverse_map(forward: dict[str, list[str]]) -> dict[str, str]:
     return rev
 
 
+# Lookups for the default SHARES_TAGMAP, built once at import instead of per ZIP
+_SHARES_REVERSE = TAG_TO_CANON_BY_SECTION["SHARES"]
+_SHARES_PREF_RANK = PREF_RANK_BY_SECTION["SHARES"]
+
+
 def _prep_num_with_meta(dfs: dict[str, pd.DataFrame]) -> pd.DataFrame:
-    sub = dfs["sub"][["adsh", "cik", "name", "form", "fy", "fp", "period", "filed", "sic"]].copy()
-    num = dfs["num"][["adsh", "tag", "ddate", "qtrs", "uom", "value"]].copy()
+    sub = dfs["sub"][["adsh", "cik", "name", "form", "fy", "fp", "period", "filed", "sic"]]
+    num = dfs["num"][["adsh", "tag", "ddate", "qtrs", "uom", "value"]]
     df = num.merge(sub, on="adsh", how="left")
-    for c in ("uom", "qtrs", "fp", "form"):
+    # uom / qtrs are only filtered on: dictionary-encode them (a handful of labels).
+    # fp / form stay strings, they are pivot index columns of the silver output.
+    for c in ("uom", "qtrs"):
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    for c in ("fp", "form"):
         if c in df.columns:
             df[c] = df[c].astype(str)
     return df
@@ -45,7 +56,7 @@ def transform_shares_to_wide(
           * uom == 'shares'
           * qtrs in {'0','1','2','3','4'}  (instant + duration styles)
     """
-    dfs = load_fsds_from_zip(zip_path)
+    dfs = load_fsds_from_zip(zip_path, tables=("sub", "num"))
     df = _prep_num_with_meta(dfs)
     if df.empty:
         return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
@@ -53,31 +64,23 @@ def transform_shares_to_wide(
     if forms is None:
         forms = ALL_FORMS
 
-    mask = df["form"].isin(forms)
+    mask = df["form"].astype("category").isin(forms)
 
     if fp is not None:
-        fp_upper = df["fp"].astype(str).str.upper()
-        if isinstance(fp, (list, tuple, set)):
-            fp_vals = {str(x).upper() for x in fp}
-            mask = mask & fp_upper.isin(fp_vals)
-        else:
-            mask = mask & (fp_upper == str(fp).upper())
+        fp_vals = {str(x).upper() for x in fp} if isinstance(fp, (list, tuple, set)) else {str(fp).upper()}
+        mask = mask & stmt_mask(df["fp"].astype("category"), lambda labels: labels.isin(fp_vals))
 
     # at-period date
     mask = mask & (df["ddate"] == df["period"])
-    df = df[mask].copy()
-    if df.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
 
     # shares only
-    df = df[df["uom"].astype(str).str.lower() == "shares"].copy()
-    if df.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+    mask = mask & stmt_mask(df["uom"], lambda labels: labels == "SHARES")
 
     # keep both instant (0) and period (1–4)
-    df = df[df["qtrs"].isin(["0", "1", "2", "3", "4"])].copy()
-    if df.empty:
-        return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
+    mask = mask & df["qtrs"].isin(["0", "1", "2", "3", "4"])
+
+    # one subset + copy for all filters above ("value" is rewritten next)
+    df = df[mask].copy()
 
     # numeric
     df["value"] = pd.to_numeric(df["value"], errors="coerce")
@@ -86,30 +89,25 @@ def transform_shares_to_wide(
         return (pd.DataFrame(), pd.DataFrame()) if return_unknown else pd.DataFrame()
 
     # map tag -> canon
-    reverse = _reverse_map(tag_map)
-    df["canon"] = df["tag"].map(reverse)
+    reverse = _SHARES_REVERSE if tag_map is SHARES_TAGMAP else _reverse_map(tag_map)
+    df["canon"] = map_categorical(df["tag"], reverse)
 
-    unknown = df[df["canon"].isna()].copy()
-    mapped = df[df["canon"].notna()].copy()
+    has_canon = df["canon"].notna()
+    unknown = df[~has_canon]
+    mapped = df[has_canon].copy()
     if mapped.empty:
         return (pd.DataFrame(), unknown) if return_unknown else pd.DataFrame()
 
     # resolve collisions
-    pref_rank: dict[tuple[str, str], int] = {}
-    for canon, syns in tag_map.items():
-        order = [canon, *(syns or [])]
-        for i, t in enumerate(order):
-            pref_rank[(canon, t)] = i
-
-    mapped["__rank"] = mapped.apply(
-        lambda r: pref_rank.get((r["canon"], r["tag"]), 10_000), axis=1
-    )
+    pref_rank = _SHARES_PREF_RANK if tag_map is SHARES_TAGMAP else tag_pref_rank(tag_map)
+    mapped["__rank"] = map_categorical(mapped["tag"], pref_rank, fill_value=10_000, dtype="float64")
     mapped["__abs"] = mapped["value"].abs()
 
+    # sort on the two tie-break keys only; head(1) is a hash pass over (adsh, canon)
     mapped = (
-        mapped.sort_values(["adsh", "canon", "__rank", "__abs"],
-                           ascending=[True, True, True, False])
-              .drop_duplicates(["adsh", "canon"], keep="first")
+        mapped.sort_values(["__rank", "__abs"], ascending=[True, False], kind="stable")
+              .groupby(["adsh", "canon"], sort=False)
+              .head(1)
               .drop(columns=["__rank", "__abs"])
     )
 
@@ -117,14 +115,19 @@ def transform_shares_to_wide(
     index_cols = ["adsh", "cik", "name", "form", "fy", "fp", "filed", "period", "sic"]
     index_cols = [c for c in index_cols if c in mapped.columns]
 
-    wide = (
-        mapped.pivot_table(index=index_cols, columns="canon", values="value", aggfunc="first")
-              .reset_index()
-    )
-    wide.columns.name = None
+    # (adsh, canon) is unique after collision resolution: reshape on adsh
+    # alone, then join back the one-row-per-filing ID columns
+    values = mapped.pivot(index="adsh", columns="canon", values="value")
+    values.columns.name = None
+    ids = mapped[index_cols].drop_duplicates("adsh").set_index("adsh")
+    wide = ids.join(values, how="inner", sort=True).reset_index()
 
     if out_path is not None:
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        wide.to_parquet(out_path, index=False)
+        wide.to_parquet(
+            out_path, index=False, engine="pyarrow",
+            compression="zstd", compression_level=3,
+            row_group_size=64 * 1024, use_dictionary=True,
+        )
 
     return (wide, unknown) if return_unknown else wide
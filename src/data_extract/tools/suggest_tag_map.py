@@ -1,7 +1,7 @@
 from pathlib import Path
 import pandas as pd
 from collections import defaultdict
-from src.data_extract.bronze_extractor.fsds_loader import load_fsds_from_zip
+from src.data_extract.bronze_extractor.fsds_loader import load_fsds_from_zip, stmt_mask
 
 FORMS = {"10-K", "10-K/A"}
 
@@ -22,12 +22,10 @@ def suggest_from_zip(zip_path: Path, top_n: int = 40) -> dict:
     if "name" not in sub.columns and "conm" in sub.columns:
         sub = sub.rename(columns={"conm": "name"})
 
-    # map stmt tags from PRE
-    pre["stmt"] = pre["stmt"].str.upper()
+    # map stmt tags from PRE (case-insensitive, matched on the stmt labels only)
     stmt_tags = {
-        "BS": pre.loc[pre["stmt"] == "BS", ["adsh","tag"]].drop_duplicates(),
-        "IS": pre.loc[pre["stmt"] == "IS", ["adsh","tag"]].drop_duplicates(),
-        "CF": pre.loc[pre["stmt"] == "CF", ["adsh","tag"]].drop_duplicates(),
+        s: pre.loc[stmt_mask(pre["stmt"], lambda labels, s=s: labels == s), ["adsh","tag"]].drop_duplicates()
+        for s in ("BS", "IS", "CF")
     }
 
     # helper to compute top tags by # of distinct filings using them
@@ -1,3 +1,5 @@
+import numpy as np
+import pandas as pd
 from statsmodels.tsa.stattools import adfuller, kpss
 
 # Mean Reversion Tests for Sector-Level Annual Average Growth Rates
@@ -39,36 +41,45 @@ def office_stationarity_tests(df):
     return pd.DataFrame(results)
 
 # AR(1) Estimation for Sector-Level Annual Average Growth Rates
-import statsmodels.api as sm
 def estimate_ar1_by_office(df):
-    results = []
-
-    for office, d in df.groupby("office"):
-        # avoid tiny groups
-        if d["g_lag"].notnull().sum() < 30:
-            continue
-
-        X = sm.add_constant(d["g_lag"])
-        y = d["g"]
-
-        model = sm.OLS(y, X, missing="drop").fit()
-
-        alpha = model.params["const"]
-        phi = model.params["g_lag"]
-        sigma = model.resid.std(ddof=1)
-
-        kappa = 1 - phi
-        mu = alpha / kappa if kappa != 0 else np.nan
-
-        results.append({
-            "office": office,
-            "alpha": alpha,
-            "phi (persistence)": phi,
-            "kappa (speed of mean reversion)": kappa,
-            "mu (long-run mean growth)": mu,
-            "sigma (volatility)": sigma,
-            "n_obs": len(d),
-            "n_cik": d["cik"].nunique()
-        })
-
-    return pd.DataFrame(results)
\ No newline at end of file
+    # OLS of g on g_lag per office in closed form: one groupby over the sums
+    # instead of a statsmodels fit per office (same alpha, phi and residual std)
+    grp = df.groupby("office")
+    n_lag = grp["g_lag"].count()
+
+    # rows used by the regression (missing="drop")
+    d = df.dropna(subset=["g", "g_lag"])
+    x, y = d["g_lag"], d["g"]
+    sums = (
+        d.assign(xx=x * x, yy=y * y, xy=x * y)
+         .groupby("office")[["g_lag", "g", "xx", "yy", "xy"]]
+         .sum()
+    )
+    m = d.groupby("office").size()
+
+    # avoid tiny groups
+    keep = n_lag.index[n_lag >= 30].intersection(sums.index)
+    sums, m = sums.loc[keep], m.loc[keep]
+
+    sxx = sums["xx"] - sums["g_lag"] ** 2 / m
+    sxy = sums["xy"] - sums["g_lag"] * sums["g"] / m
+    syy = sums["yy"] - sums["g"] ** 2 / m
+
+    phi = sxy / sxx
+    alpha = (sums["g"] - phi * sums["g_lag"]) / m
+    ssr = (syy - phi * sxy).clip(lower=0)
+    sigma = np.sqrt(ssr / (m - 1))  # resid.std(ddof=1); residuals have zero mean
+
+    kappa = 1 - phi
+    mu = (alpha / kappa).where(kappa != 0, np.nan)
+
+    return pd.DataFrame({
+        "office": keep,
+        "alpha": alpha.to_numpy(),
+        "phi (persistence)": phi.to_numpy(),
+        "kappa (speed of mean reversion)": kappa.to_numpy(),
+        "mu (long-run mean growth)": mu.to_numpy(),
+        "sigma (volatility)": sigma.to_numpy(),
+        "n_obs": grp.size().loc[keep].to_numpy(),
+        "n_cik": grp["cik"].nunique().loc[keep].to_numpy(),
+    })
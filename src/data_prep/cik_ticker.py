@@ -155,31 +155,17 @@ def infer_cik_tickers_from_fsds_zips(
         sub = sub[["cik", "instance"]].dropna()
         sub["cik"] = pd.to_numeric(sub["cik"], errors="coerce").astype("Int64")
 
-        def infer_from_instance(inst: str) -> str | None:
-            inst = str(inst)
-            base = inst.split(".")[0]      # dg-20130201.xml -> dg-20130201
-            prefix = base.split("-")[0]    # dg-20130201 -> dg
-            cand = prefix.strip().upper()  # DG
-
-            # Heuristic: tickers usually 1–5 letters, all alphabetic
-            if 1 <= len(cand) <= 5 and cand.isalpha():
-                return cand
-            return None
-
-        sub["ticker_inferred"] = sub["instance"].apply(infer_from_instance)
+        sub["ticker_inferred"] = tickers_from_instance(sub["instance"])
         sub = sub.dropna(subset=["ticker_inferred"])
 
-        for _, row in sub.iterrows():
-            records.append({
-                "cik": row["cik"],
-                "ticker_inferred": row["ticker_inferred"],
-            })
+        # whole frame per ZIP, no per-row dicts
+        records.append(sub[["cik", "ticker_inferred"]])
 
     if not records:
         print("[WARN] No tickers inferred from FSDS zips.")
         return pd.DataFrame(columns=["cik", "ticker_inferred"])
 
-    df_all = pd.DataFrame(records)
+    df_all = pd.concat(records, ignore_index=True)
     df_all["cik"] = pd.to_numeric(df_all["cik"], errors="coerce").astype("Int64")
 
     # For each cik, choose the most common inferred ticker
@@ -201,3 +187,17 @@ def ticker_from_instance(instance: str) -> str | None:
     if 1 <= len(cand) <= 5 and cand.isalpha():
         return cand
     return None
+
+
+def tickers_from_instance(instance: pd.Series) -> pd.Series:
+    """
+    Vectorised ticker_from_instance over a Series of instance names.
+    'dg-20130201.xml' -> 'DG'; values that don't look like a 1-5 letter ticker -> NaN.
+    """
+    cand = (
+        instance.astype("string")
+        .str.split(".", n=1).str[0]      # dg-20130201.xml -> dg-20130201
+        .str.split("-", n=1).str[0]      # dg-20130201 -> dg
+        .str.strip().str.upper()         # DG
+    )
+    return cand.where(cand.str.fullmatch(r"[A-Z]{1,5}").fillna(False)).astype(object)
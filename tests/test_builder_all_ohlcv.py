@@ -0,0 +1,71 @@
+import importlib.util
+import unittest
+
+import numpy as np
+import pandas as pd
+
+HAS_YF = importlib.util.find_spec("yfinance") is not None
+if HAS_YF:
+    from src.data_extract.gold_builder.builder_all_ohlcv import FY_FEATURE_COLS, _fy_window_features
+
+
+def _window_features_loop(px, period, lookback_months):
+    """Reference: the original per-filing window loop of attach_fy_ohlcv_to_panel."""
+    px = px.sort_values("date")
+    log_ret = np.log(px["close"]).diff()
+    win = px[(px["date"] > period - pd.DateOffset(months=lookback_months)) & (px["date"] <= period)]
+    if win.empty:
+        return [np.nan] * 6
+    close_end, close_start = float(win["close"].iloc[-1]), float(win["close"].iloc[0])
+    if not np.isfinite(close_start) or close_start == 0:
+        close_end = close_start = ret = np.nan
+    else:
+        ret = close_end / close_start - 1.0
+    win_log_ret = log_ret[win.index].dropna()
+    vol = win_log_ret.std() if not win_log_ret.empty else np.nan
+    return [close_end, close_start, ret, win["high"].max(), win["low"].min(), vol]
+
+
+@unittest.skipUnless(HAS_YF, "yfinance not installed")
+class FyWindowFeaturesTest(unittest.TestCase):
+    def test_matches_calendar_window_loop_with_gaps(self):
+        rng = np.random.default_rng(0)
+        dates = pd.date_range("2015-01-31", "2022-12-31", freq="ME")
+        # trading halt (7 months), scattered missing bars, delisting before the last periods
+        keep = ~dates.isin(dates[30:37]) & (rng.random(len(dates)) > 0.15) & (dates < "2022-03-01")
+        dates = dates[keep]
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.08, len(dates))))
+        px = pd.DataFrame({
+            "date": dates,
+            "close": close,
+            "high": close * 1.05,
+            "low": close * 0.95,
+        })
+        px.loc[5, "high"] = np.nan
+        px.loc[10, "close"] = np.nan
+        px.loc[40, "close"] = 0.0
+
+        # listing (first bar 2015-01) inside early windows, periods inside the halt,
+        # off month-end, and after delisting
+        periods = pd.Series(pd.to_datetime([
+            "2014-06-30", "2015-03-31", "2015-12-31", "2017-09-30", "2017-10-15",
+            "2018-06-30", "2019-12-31", "2021-02-28", "2022-06-30", "2023-12-31",
+        ]))
+        for lookback in (1, 6, 12):
+            got = _fy_window_features(px, periods, lookback)
+            want = np.array([_window_features_loop(px, p, lookback) for p in periods])
+            np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-12, equal_nan=True)
+        self.assertEqual(got.shape, (len(periods), len(FY_FEATURE_COLS)))
+
+    def test_no_stale_bar_beyond_window(self):
+        px = pd.DataFrame({
+            "date": pd.to_datetime(["2020-01-31", "2020-02-29"]),
+            "close": [10.0, 11.0], "high": [10.5, 11.5], "low": [9.5, 10.5],
+        })
+        # window (2020-02-29, 2020-03-31] is empty: the February bar is not carried over
+        got = _fy_window_features(px, pd.Series(pd.to_datetime(["2020-03-31"])), 1)
+        self.assertTrue(np.isnan(got).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import pandas as pd
+
+from src.data_extract.gold_builder.builder_per_zip import _latest_per_cik_fy
+
+
+class LatestPerCikFyTest(unittest.TestCase):
+    def test_latest_filed_wins(self):
+        df = pd.DataFrame({
+            "adsh": ["a1", "a2", "a3"],
+            "cik": ["1", "1", "2"],
+            "fy": ["2023", "2023", "2023"],
+            "filed": ["20240301", "20240115", "20240201"],
+        })
+        out = _latest_per_cik_fy(df)
+        self.assertEqual(out["adsh"].tolist(), ["a1", "a3"])
+
+    def test_tied_filed_keeps_last_row(self):
+        # same as the old sort_values + drop_duplicates(keep="last")
+        df = pd.DataFrame({
+            "adsh": ["0001-42", "0002-10", "0001-43"],
+            "cik": ["100", "200", "100"],
+            "fy": ["2023", "2023", "2023"],
+            "filed": ["20240301", "20240301", "20240301"],
+        })
+        out = _latest_per_cik_fy(df)
+        self.assertEqual(out["adsh"].tolist(), ["0001-43", "0002-10"])
+
+        out = _latest_per_cik_fy(df.iloc[::-1])
+        self.assertEqual(out["adsh"].tolist(), ["0001-42", "0002-10"])
+
+    def test_missing_filed_counts_as_latest(self):
+        df = pd.DataFrame({
+            "adsh": ["a1", "a2"],
+            "cik": ["1", "1"],
+            "fy": ["2023", "2023"],
+            "filed": [None, "20240301"],
+        })
+        self.assertEqual(_latest_per_cik_fy(df)["adsh"].tolist(), ["a1"])
+
+
+if __name__ == "__main__":
+    unittest.main()